@@ -4,38 +4,97 @@ from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_mail import Mail
 from flask_bcrypt import Bcrypt
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
+from app.cart import CartManager
 import os
 
-load_dotenv()
-
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
 mail = Mail()
 bcrypt = Bcrypt()
+carts = CartManager()
 
 def create_app():
+    load_dotenv()
     app = Flask(__name__)
 
     #configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'default_secret_key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///site.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # Per worker process; size it to the gunicorn threads per worker
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),  # seconds to wait for a connection
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),  # seconds, below server idle timeouts
+            'pool_pre_ping': True,
+        }
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 10000)),  # ms
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # bytes
+        'cache_size': -int(os.getenv('SQLITE_CACHE_KB', 64 * 1024)),  # negative = KiB per connection
+    }
+    app.config['CART_BACKEND'] = os.getenv('CART_BACKEND', 'sqlite')  # 'sqlite' or 'memory'
+    app.config['CATALOG_VERSION_CHECK_INTERVAL'] = float(os.getenv('CATALOG_VERSION_CHECK_INTERVAL', 0))  # seconds
+    app.config['POS_PAGE_SIZE'] = int(os.getenv('POS_PAGE_SIZE', 48))
+    app.config['TILL_SYNC_MAX_BATCH'] = int(os.getenv('TILL_SYNC_MAX_BATCH', 500))  # queued sales per /api/till/sync request
+    app.config['INSTRUMENTATION_ENABLED'] = os.getenv('INSTRUMENTATION_ENABLED', '').lower() in ('1', 'true', 'yes')
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')  # bearer token for /metrics, optional
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))  # bcrypt work factor
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # concurrent hashes per process
+    app.config['LOGIN_MAX_FAILURES'] = int(os.getenv('LOGIN_MAX_FAILURES', 5))  # per client and email ...
+    app.config['LOGIN_FAILURE_WINDOW'] = int(os.getenv('LOGIN_FAILURE_WINDOW', 300))  # ... within this many seconds
+    app.config['PROXY_FIX_X_FOR'] = int(os.getenv('PROXY_FIX_X_FOR', 0))  # trusted proxies setting X-Forwarded-For, 0 = none
+    app.config['USER_CACHE_TTL'] = float(os.getenv('USER_CACHE_TTL', 5))  # seconds a role change may take to reach every worker, 0 = off
+    app.config['STATS_CACHE_TTL'] = float(os.getenv('STATS_CACHE_TTL', 10))  # seconds, 0 = off
+    app.config['RESERVATION_TTL'] = int(os.getenv('RESERVATION_TTL', 900))  # seconds a cart holds stock
+    app.config['RESERVATION_SWEEP_INTERVAL'] = float(os.getenv('RESERVATION_SWEEP_INTERVAL', 60))  # seconds, 0 = off
+
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 
     #initialze extensions
     db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            from app.database import apply_sqlite_pragmas
+            apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+            from app.search import restore_search_triggers
+            if restore_search_triggers():
+                app.logger.warning('Product search triggers were missing (interrupted import?); search index rebuilt')
+            db.session.remove()
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
     #register user_loader after app and extensions are initialized
-    from app.models import User
+    from app.user_cache import user_cache
+    user_cache.init_app(app)
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.get(int(user_id))
     
     bcrypt.init_app(app)
+    carts.init_app(app)
+
+    from app.stats import stats_cache
+    stats_cache.init_app(app)
+
+    from app.passwords import passwords, login_throttle
+    passwords.init_app(app)
+    login_throttle.init_app(app)
+
+    from app.instrumentation import instrumentation
+    instrumentation.init_app(app)
+
+    from app.reservations import sweeper
+    sweeper.init_app(app)
 
     # Register blueprints
     from app.auth import bp as auth_bp
@@ -44,6 +103,12 @@ def create_app():
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
 
+    # Register CLI commands
+    from app.commands import reports_cli, products_cli, events_cli
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(products_cli)
+    app.cli.add_command(events_cli)
+
     return app
 
 
@@ -1,16 +1,38 @@
 from flask import render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
-from app import db, bcrypt
+from app import db
 from app.models import User
 from app.forms import RegistrationForm, LoginForm
 from app.auth import bp
+from app.passwords import passwords, login_throttle, HashingBusy
+from app.stats import stats_cache, USER_STATS
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     form = LoginForm()
     if form.validate_on_submit():
+        address = request.remote_addr
+        retry_after = login_throttle.retry_after(address, form.email.data)
+        if retry_after:
+            flash(f'Too many failed logins. Try again in {retry_after} seconds.', 'danger')
+            return render_template("login.html", form=form), 429
+
         user = User.query.filter_by(email=form.email.data).first()
-        if user and bcrypt.check_password_hash(user.password_hash, form.password.data):
+        try:
+            valid = user is not None and passwords.check(user.password_hash, form.password.data)
+        except HashingBusy:
+            flash('The system is busy signing other users in. Please try again in a moment.', 'danger')
+            return render_template("login.html", form=form), 503
+
+        if valid:
+            login_throttle.succeeded(address, form.email.data)
+            if passwords.needs_rehash(user.password_hash):
+                # BCRYPT_LOG_ROUNDS changed since this hash was made
+                try:
+                    user.password_hash = passwords.hash(form.password.data)
+                    db.session.commit()
+                except HashingBusy:
+                    pass  # rehashed on a later login
             login_user(user)
             flash('Login successful! Welcome to Smart-Retail POS.', 'success')
             if user.role == 'admin':
@@ -20,6 +42,7 @@ def login():
             else:
                 return redirect(url_for('main.dashboard'))
         else:
+            login_throttle.failed(address, form.email.data)
             flash('Login failed. Please check your email and password.', 'danger')
     return render_template("login.html", form=form)
 
@@ -28,7 +51,11 @@ def register():
     form = RegistrationForm()
 
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        try:
+            hashed_password = passwords.hash(form.password.data)
+        except HashingBusy:
+            flash('The system is busy. Please try again in a moment.', 'danger')
+            return render_template("register.html", form=form), 503
         user = User(
             name=form.name.data,
             email=form.email.data,
@@ -37,6 +64,7 @@ def register():
         )
 
         db.session.add(user)
+        stats_cache.invalidate(USER_STATS)
         db.session.commit()
 
         flash('Account created successfully! You can now log in to Smart-Retail POS.', 'success')
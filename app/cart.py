@@ -0,0 +1,226 @@
+"""
+Server-side shopping cart storage.
+
+The browser session only carries a short cart token (session['cart_id']);
+the cart lines themselves live in a pluggable backend, indexed by
+product_id so adding, updating and removing a line is a single lookup.
+
+Backends:
+    memory  - process-local LRU dict, for development and single-worker runs
+    sqlite  - a cart_line table in a local SQLite file shared by all workers
+
+Carts left untouched for longer than a reservation lasts (RESERVATION_TTL)
+are purged by the reservation sweeper, as their stock holds have lapsed.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import session
+from app.utils import to_cents, from_cents
+
+LINE_FIELDS = ('product_id', 'product_code', 'product_name', 'unit_price', 'quantity', 'is_low_stock')
+
+
+class MemoryCartStore:
+    """In-process cart store with least-recently-used eviction"""
+
+    def __init__(self, max_carts=10000):
+        self.max_carts = max_carts
+        self._carts = OrderedDict()
+        self._touched = {}
+        self._lock = threading.Lock()
+
+    def _cart(self, cart_id, create=False):
+        cart = self._carts.get(cart_id)
+        if cart is None:
+            if not create:
+                return {}
+            cart = self._carts[cart_id] = {}
+            while len(self._carts) > self.max_carts:
+                self._touched.pop(self._carts.popitem(last=False)[0], None)
+        self._carts.move_to_end(cart_id)
+        self._touched[cart_id] = time.monotonic()
+        return cart
+
+    def lines(self, cart_id):
+        with self._lock:
+            return {pid: dict(line) for pid, line in self._cart(cart_id).items()}
+
+    def get_line(self, cart_id, product_id):
+        with self._lock:
+            line = self._cart(cart_id).get(product_id)
+            return dict(line) if line else None
+
+    def put_line(self, cart_id, line):
+        with self._lock:
+            self._cart(cart_id, create=True)[line['product_id']] = dict(line)
+
+    def remove_line(self, cart_id, product_id):
+        with self._lock:
+            self._cart(cart_id).pop(product_id, None)
+
+    def clear(self, cart_id):
+        with self._lock:
+            self._carts.pop(cart_id, None)
+            self._touched.pop(cart_id, None)
+
+    def purge(self, max_age):
+        """Drop carts untouched for max_age seconds; returns how many"""
+        cutoff = time.monotonic() - max_age
+        purged = 0
+        with self._lock:
+            # Least recently used first, so stop at the first fresh cart
+            while self._carts:
+                cart_id = next(iter(self._carts))
+                if self._touched.get(cart_id, 0) >= cutoff:
+                    break
+                del self._carts[cart_id]
+                self._touched.pop(cart_id, None)
+                purged += 1
+        return purged
+
+
+class SQLiteCartStore:
+    """Cart store backed by a cart_line table in a local SQLite file"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cart_line (
+            cart_id TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            product_code TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            unit_price INTEGER NOT NULL,  -- cents
+            quantity INTEGER NOT NULL,
+            is_low_stock INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (cart_id, product_id)
+        )
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # A throwaway connection, so a gunicorn master that builds the app
+        # before forking leaves no connection behind for its workers to share
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                conn.execute(self.SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_line(row):
+        line = {field: row[field] for field in LINE_FIELDS}
+        line['unit_price'] = from_cents(line['unit_price'])
+        line['is_low_stock'] = bool(line['is_low_stock'])
+        return line
+
+    def lines(self, cart_id):
+        rows = self._connect().execute(
+            'SELECT * FROM cart_line WHERE cart_id = ? ORDER BY rowid', (cart_id,)
+        )
+        return {row['product_id']: self._to_line(row) for row in rows}
+
+    def get_line(self, cart_id, product_id):
+        row = self._connect().execute(
+            'SELECT * FROM cart_line WHERE cart_id = ? AND product_id = ?', (cart_id, product_id)
+        ).fetchone()
+        return self._to_line(row) if row else None
+
+    def put_line(self, cart_id, line):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO cart_line (cart_id, product_id, product_code, product_name,
+                                       unit_price, quantity, is_low_stock)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (cart_id, product_id) DO UPDATE SET
+                    unit_price = excluded.unit_price,
+                    quantity = excluded.quantity,
+                    is_low_stock = excluded.is_low_stock,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (cart_id, line['product_id'], line['product_code'], line['product_name'],
+                 to_cents(line['unit_price']), line['quantity'], int(line['is_low_stock']))
+            )
+
+    def remove_line(self, cart_id, product_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cart_line WHERE cart_id = ? AND product_id = ?', (cart_id, product_id))
+
+    def clear(self, cart_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cart_line WHERE cart_id = ?', (cart_id,))
+
+    def purge(self, max_age):
+        """Delete carts with no line written for max_age seconds; returns how many lines"""
+        with self._connect() as conn:
+            return conn.execute(
+                """
+                DELETE FROM cart_line WHERE cart_id IN (
+                    SELECT cart_id FROM cart_line GROUP BY cart_id
+                    HAVING MAX(updated_at) < datetime('now', ?)
+                )
+                """,
+                (f'-{int(max_age)} seconds',)
+            ).rowcount
+
+
+class CartManager:
+    """Flask extension that binds the configured cart store to the session token"""
+
+    def __init__(self, app=None):
+        self.store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.setdefault('CART_BACKEND', 'sqlite')
+        if backend == 'memory':
+            self.store = MemoryCartStore(app.config.setdefault('CART_MAX_CARTS', 10000))
+        elif backend == 'sqlite':
+            os.makedirs(app.instance_path, exist_ok=True)
+            path = app.config.setdefault('CART_SQLITE_PATH', os.path.join(app.instance_path, 'carts.db'))
+            self.store = SQLiteCartStore(path)
+        else:
+            raise ValueError(f'Unknown CART_BACKEND: {backend}')
+        app.extensions['carts'] = self
+
+    def cart_id(self):
+        """Return the cart token for the current session, issuing one if needed"""
+        if 'cart_id' not in session:
+            session['cart_id'] = uuid.uuid4().hex
+        return session['cart_id']
+
+    def items(self):
+        return list(self.store.lines(self.cart_id()).values())
+
+    def get_line(self, product_id):
+        return self.store.get_line(self.cart_id(), product_id)
+
+    def put_line(self, line):
+        self.store.put_line(self.cart_id(), line)
+
+    def remove_line(self, product_id):
+        self.store.remove_line(self.cart_id(), product_id)
+
+    def clear(self):
+        self.store.clear(self.cart_id())
+
+    def purge(self, max_age):
+        """Drop every cart left untouched for max_age seconds"""
+        return self.store.purge(max_age)
@@ -0,0 +1,140 @@
+"""
+Process-local product catalog cache for the POS screen.
+
+Each worker keeps every product's code, name, category and price in
+memory, indexed by id and by product_code, so listing the catalog or
+resolving a scanned barcode is a dict lookup. Writes that change those
+fields call bump() inside their own database transaction; other workers
+see the new version stamp in the cache_version table and reload lazily
+on their next request.
+
+Stock levels are not cached: every cart, sale and sweep moves them, and
+bumping for each of those would have every worker reloading the whole
+table all shift. The items handed out carry stock read live, in one
+query for the products being shown.
+"""
+
+import bisect
+import threading
+import time
+import zlib
+from collections import namedtuple
+from operator import attrgetter
+from flask import current_app, g
+from app import db
+from app.database import upsert_increment
+from app.models import Product, CacheVersion
+
+CATALOG = 'catalog'
+
+
+class CatalogEntry(namedtuple('CatalogEntry', 'id product_code name category price')):
+    """Cached part of a Product row"""
+    __slots__ = ()
+
+
+class CatalogItem(namedtuple('CatalogItem', CatalogEntry._fields + ('stock_quantity',))):
+    """Read-only snapshot of a Product row, with its live stock level"""
+    __slots__ = ()
+
+    def is_low_stock(self):
+        """Check if product stock is below 10"""
+        return self.stock_quantity < 10
+
+
+class CatalogCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._items = []
+        self._by_id = {}
+        self._by_code = {}
+
+    def _stored_version(self):
+        version = db.session.query(CacheVersion.version).filter_by(name=CATALOG).scalar()
+        return version or 0
+
+    def _load(self, version):
+        rows = db.session.query(
+            Product.id, Product.product_code, Product.name, Product.category, Product.price
+        ).order_by(Product.id).all()
+        items = [CatalogEntry(*row) for row in rows]
+        self._items = items
+        self._by_id = {item.id: item for item in items}
+        self._by_code = {item.product_code: item for item in items}
+        self._version = version
+
+    def _ensure_fresh(self):
+        """Check the shared version stamp at most once per request (and per interval)"""
+        if g.get('catalog_checked'):
+            return
+        g.catalog_checked = True
+
+        interval = current_app.config.get('CATALOG_VERSION_CHECK_INTERVAL', 0)
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < interval:
+            return
+
+        version = self._stored_version()
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                self._load(version)
+
+    def _with_stock(self, entries, whole_catalog=False):
+        """CatalogItems for entries, skipping products deleted since the last load"""
+        query = db.session.query(Product.id, Product.stock_quantity)
+        if not whole_catalog:
+            if not entries:
+                return []
+            query = query.filter(Product.id.in_([entry.id for entry in entries]))
+        stock = dict(query.all())
+        return [CatalogItem(*entry, stock[entry.id]) for entry in entries if entry.id in stock]
+
+    def _one(self, entry):
+        items = self._with_stock([entry]) if entry else []
+        return items[0] if items else None
+
+    def snapshot(self):
+        """Return (version, items) for the whole catalog.
+
+        The version changes whenever a product or any stock level does, so
+        it can serve as an ETag.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            version, entries = self._version, self._items
+        items = self._with_stock(entries, whole_catalog=True)
+        levels = ','.join(str(item.stock_quantity) for item in items).encode()
+        return f'{version}-{zlib.crc32(levels):08x}', items
+
+    def page(self, after=None, limit=50):
+        """Return (items, next_cursor) for the products with id > after, in id order"""
+        self._ensure_fresh()
+        items = self._items
+        start = bisect.bisect_right(items, after, key=attrgetter('id')) if after is not None else 0
+        page = items[start:start + limit]
+        next_cursor = page[-1].id if start + limit < len(items) else None
+        return self._with_stock(page), next_cursor
+
+    def get(self, product_id):
+        self._ensure_fresh()
+        return self._one(self._by_id.get(product_id))
+
+    def get_by_code(self, product_code):
+        self._ensure_fresh()
+        return self._one(self._by_code.get(product_code))
+
+    def bump(self):
+        """Invalidate every worker's catalog; call before committing a product add,
+        delete or change of code, name, category or price (stock changes need none)"""
+        upsert_increment(
+            CacheVersion,
+            [{'name': CATALOG, 'version': 1}],
+            key_columns=('name',),
+            counter_columns=('version',)
+        )
+
+
+catalog = CatalogCache()
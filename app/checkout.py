@@ -0,0 +1,111 @@
+from datetime import datetime
+from sqlalchemy import insert, delete
+from app import db
+from app.models import Product, Transaction, Sale, StockReservation
+from app.reports import record_sale_rollup, record_shift_totals
+from app.events import log_sales
+from app.reservations import InsufficientStockError, touch, adjust_stock
+from app.utils import to_money, vat_for
+
+
+def cart_totals(cart):
+    """Return exact (subtotal, vat, grand_total) for a list of cart items.
+
+    VAT is rounded per line, so the transaction VAT always equals the sum of
+    the VAT recorded against its lines in the sales rollup.
+    """
+    subtotal = vat = to_money(0)
+    for item in cart:
+        line_total = to_money(item['unit_price']) * item['quantity']
+        subtotal += line_total
+        vat += vat_for(line_total)
+    return subtotal, vat, subtotal + vat
+
+
+def _quantities_by_product(cart):
+    """Collapse cart lines into {product_id: total quantity}"""
+    quantities = {}
+    for item in cart:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+    return quantities
+
+
+def complete_sale(cashier_id, cart, payment_method, cart_id=None, client_ref=None, sold_at=None, oversell=False):
+    """Record a sale for the given cart in a single database transaction.
+
+    Units the cart already holds in stock_reservation (under cart_id) are
+    sold as they are; any shortfall, e.g. after a reservation expired, is
+    taken with one conditional UPDATE per product. Every product in the
+    cart is loaded with one IN (...) query, the Sale rows are inserted in
+    bulk, the cart's reservations are deleted, the daily sales rollup is
+    updated and the lines are appended to the sales event log. If any line
+    would oversell, nothing is written and InsufficientStockError is raised.
+
+    Sales synced from an offline till already happened: they pass the
+    till's client_ref (unique, so a resent sale fails with IntegrityError),
+    the time of sale as sold_at, and oversell=True to record them even if
+    that takes stock below zero.
+    """
+    quantities = _quantities_by_product(cart)
+    products = {
+        p.id: p for p in Product.query.filter(Product.id.in_(quantities)).all()
+    }
+
+    try:
+        reserved = touch(cart_id) if cart_id else {}
+        shortages = []
+        # Products in id order, so concurrent checkouts lock rows in the same order
+        for product_id, quantity in sorted(quantities.items()):
+            product = products.get(product_id)
+            if product is None:
+                shortages.append((f'Product #{product_id}', 0))
+                continue
+
+            held = reserved.pop(product_id, 0)
+            if not adjust_stock(product_id, quantity - held, oversell):
+                shortages.append((product.name, product.stock_quantity + held))
+
+        # Held units of products no longer in the cart go back on sale
+        for product_id, held in reserved.items():
+            adjust_stock(product_id, -held)
+
+        if shortages:
+            raise InsufficientStockError(shortages)
+
+        subtotal, vat, grand_total = cart_totals(cart)
+        transaction = Transaction(
+            cashier_id=cashier_id,
+            subtotal=subtotal,
+            vat_amount=vat,
+            grand_total=grand_total,
+            payment_method=payment_method,
+            status='completed',
+            client_ref=client_ref,
+            date_created=sold_at or datetime.utcnow()
+        )
+        db.session.add(transaction)
+        db.session.flush()  # Get transaction ID
+
+        if cart_id:
+            db.session.execute(delete(StockReservation).where(StockReservation.cart_id == cart_id))
+
+        db.session.execute(insert(Sale), [
+            {
+                'transaction_id': transaction.id,
+                'product_id': item['product_id'],
+                'quantity': item['quantity'],
+                'unit_price': to_money(item['unit_price']),
+                'line_total': to_money(item['unit_price']) * item['quantity']
+            }
+            for item in cart
+        ])
+        record_sale_rollup(transaction, products, cart)
+        record_shift_totals(transaction, len(cart))
+        log_sales(transaction, products, cart)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return transaction
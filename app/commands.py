@@ -0,0 +1,118 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+reports_cli = AppGroup('reports', help='Sales reporting maintenance commands.')
+
+
+@reports_cli.command('backfill')
+@click.option('--start', 'start_date', type=click.DateTime(formats=['%Y-%m-%d']), help='First day to rebuild (YYYY-MM-DD).')
+@click.option('--end', 'end_date', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day to rebuild (YYYY-MM-DD).')
+def backfill(start_date, end_date):
+    """Rebuild the daily sales rollup and cashier shift totals from existing transactions."""
+    from app.reports import backfill_rollup, backfill_shift_totals
+
+    start_date = start_date.date() if start_date else None
+    end_date = end_date.date() if end_date else None
+    rows = backfill_rollup(start_date, end_date)
+    click.echo(f'✅ Rebuilt daily sales rollup: {rows} row(s) written.')
+    rows = backfill_shift_totals(start_date, end_date)
+    click.echo(f'✅ Rebuilt cashier shift totals: {rows} row(s) written.')
+
+
+@reports_cli.command('export')
+@click.option('--level', type=click.Choice(['transactions', 'lines']), default='transactions', show_default=True, help='One row per transaction or per sale line.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True, help='Output format.')
+@click.option('--start', 'start_date', type=click.DateTime(formats=['%Y-%m-%d']), help='First day to export (YYYY-MM-DD).')
+@click.option('--end', 'end_date', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day to export (YYYY-MM-DD).')
+@click.option('--cashier', 'cashier_id', type=int, help='Only this cashier\'s transactions.')
+@click.option('--output', type=click.File('w', encoding='utf-8', lazy=True), default='-', help='Output file (default: stdout).')
+def export(level, fmt, start_date, end_date, cashier_id, output):
+    """Stream transactions or sale lines as CSV or JSON Lines."""
+    from app.exports import stream_export
+
+    for chunk in stream_export(
+        level, fmt,
+        start_date.date() if start_date else None,
+        end_date.date() if end_date else None,
+        cashier_id
+    ):
+        output.write(chunk)
+
+
+products_cli = AppGroup('products', help='Product catalog maintenance commands.')
+
+
+@products_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='File format (default: from the extension).')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows upserted per transaction.')
+@click.option('--rejects', 'rejects_path', type=click.Path(dir_okay=False), help='Where to write rejected rows (default: <path>.rejects.csv).')
+@click.option('--dry-run', is_flag=True, help='Validate the file without writing to the database.')
+def import_products(path, fmt, chunk_size, rejects_path, dry_run):
+    """Upsert products from a CSV or JSON Lines feed, keyed on product_code."""
+    import time
+    from app.product_import import import_products
+
+    rejects_path = rejects_path or f'{path}.rejects.csv'
+    started = time.perf_counter()
+    result = import_products(path, fmt, chunk_size, rejects_path, dry_run)
+    elapsed = time.perf_counter() - started
+
+    verb = 'Validated' if dry_run else 'Imported'
+    click.echo(f'✅ {verb} {result.upserted} product(s) from {result.read} row(s) in {elapsed:.1f}s.')
+    if result.rejected:
+        click.echo(f'⚠️  Rejected {result.rejected} row(s); see {rejects_path}')
+
+
+@products_cli.command('reindex')
+def reindex_products():
+    """Re-create the product search index and its triggers, e.g. after an interrupted import."""
+    from app.search import rebuild_search_index
+
+    rebuild_search_index()
+    click.echo('✅ Product search index rebuilt.')
+
+
+@products_cli.command('release-reservations')
+def release_reservations():
+    """Put the stock held by expired cart reservations back on sale."""
+    from app import carts
+    from app.reservations import sweep_expired
+
+    released = sweep_expired()
+    carts.purge(current_app.config['RESERVATION_TTL'])
+    click.echo(f'✅ Released {released} expired stock reservation(s).')
+
+
+events_cli = AppGroup('events', help='Sales event log commands.')
+
+
+@events_cli.command('backfill')
+def backfill_event_log():
+    """Seed an empty event log from past sales and today's stock counts."""
+    from app.events import backfill_events
+
+    try:
+        sales, counts = backfill_events()
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'✅ Logged {sales} past sale line(s) and {counts} opening stock count(s).')
+
+
+@events_cli.command('rebuild')
+@click.option('--projection', 'names', multiple=True, type=click.Choice(['stock', 'rollup', 'shifts']), help='Projection to rebuild (repeatable; default: all).')
+@click.option('--batch-size', default=10000, show_default=True, help='Events read per batch.')
+def rebuild_projections(names, batch_size):
+    """Rebuild stock levels, the daily sales rollup and cashier shift totals from the event log."""
+    import time
+    from app.events import rebuild, PROJECTIONS
+
+    started = time.perf_counter()
+    try:
+        written = rebuild(names or tuple(PROJECTIONS), batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'✅ Replayed the event log in {time.perf_counter() - started:.1f}s.')
+    for name, rows in written.items():
+        click.echo(f'   {name}: {rows} row(s) written')
@@ -0,0 +1,113 @@
+from functools import lru_cache
+from sqlalchemy import Integer, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.types import TypeDecorator
+from app import db
+from app.utils import to_cents, from_cents
+
+
+class Money(TypeDecorator):
+    """Rand amount stored as integer cents and exposed as a Decimal.
+
+    Sums over Money columns run as exact integer SUM() in SQL. Wrap an
+    aggregate in type_coerce(..., Money) when the expression does not keep
+    the column type (e.g. price * quantity).
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_cents(value)
+
+
+@lru_cache(maxsize=None)
+def _on_conflict_update(table, dialect, key_columns, update_columns, increment):
+    """INSERT ... ON CONFLICT DO UPDATE for one table and set of columns.
+
+    Built once per shape and reused: building the statement (and its
+    `excluded` alias) costs more than running it, and a checkout runs
+    several of them.
+    """
+    insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c[name] for name in key_columns],
+        set_={
+            name: table.c[name] + stmt.excluded[name] if increment else stmt.excluded[name]
+            for name in update_columns
+        }
+    )
+
+
+def upsert_increment(model, rows, key_columns, counter_columns):
+    """Insert rows, or add their counter values onto existing rows with the same key.
+
+    Runs as one executemany of INSERT ... ON CONFLICT DO UPDATE on SQLite and
+    PostgreSQL and falls back to UPDATE-then-INSERT on other databases. Every
+    row must carry the same keys.
+    """
+    if not rows:
+        return
+
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        stmt = _on_conflict_update(table, dialect, tuple(key_columns), tuple(counter_columns), True)
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        key = [table.c[name] == row[name] for name in key_columns]
+        result = db.session.execute(
+            table.update().where(*key).values(
+                {name: table.c[name] + row[name] for name in counter_columns}
+            )
+        )
+        if result.rowcount == 0:
+            db.session.execute(table.insert().values(row))
+
+
+def upsert(model, rows, key_columns, update_columns):
+    """Insert rows, or overwrite update_columns on existing rows with the same key.
+
+    Runs as one executemany of INSERT ... ON CONFLICT DO UPDATE on SQLite and
+    PostgreSQL and falls back to UPDATE-then-INSERT on other databases. Every
+    row must carry the same keys.
+    """
+    if not rows:
+        return
+
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        stmt = _on_conflict_update(table, dialect, tuple(key_columns), tuple(update_columns), False)
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        key = [table.c[name] == row[name] for name in key_columns]
+        result = db.session.execute(
+            table.update().where(*key).values({name: row[name] for name in update_columns})
+        )
+        if result.rowcount == 0:
+            db.session.execute(table.insert().values(row))
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run PRAGMA name=value for each pragma on every new SQLite connection.
+
+    WAL lets readers carry on while a checkout writes, and busy_timeout
+    makes a writer wait for the lock instead of failing with "database is
+    locked" when several workers write at once.
+    """
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -0,0 +1,303 @@
+"""
+Append-only sales event log and the projections replayed from it.
+
+Checkout, restocks, product edits and feed imports append compact events
+to the sales_event table in the same database transaction as the change
+itself:
+
+    count    stock counted: quantity is the units on hand (units held by
+             open carts included) and price the selling price. Written for
+             new products, feed imports and as the opening balance by
+             backfill_events.
+    sale     one sale line: quantity units sold at price, with the
+             transaction, cashier and the product's category at the time
+    restock  quantity units received
+    adjust   quantity units added by a product edit (negative = removed)
+    price    new selling price
+
+rebuild() streams the log once in id order and folds it into projections
+that replace the derived tables: stock levels and prices on Product, the
+daily sales rollup and the cashier shift totals. Each projection only
+writes its own tables, so they can also be rebuilt separately, e.g. one
+process per projection, or against a copy of the database. Since the
+projections replace their tables outright, rebuild() refuses to run while
+the log is missing the sales of any recorded transaction (e.g. a store
+with history that was never backfilled).
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import Integer, delete, func, insert, literal, null, select, type_coerce, update
+from app import db
+from app.database import upsert_increment
+from app.catalog import catalog
+from app.models import Product, Transaction, Sale, StockReservation, SalesEvent, DailySalesRollup, CashierShiftTotals
+from app.stats import stats_cache, PRODUCT_STATS
+from app.utils import to_money, from_cents, vat_cents
+
+COUNT = 'count'
+SALE = 'sale'
+RESTOCK = 'restock'
+ADJUST = 'adjust'
+PRICE = 'price'
+
+EVENT_COLUMNS = ['kind', 'product_id', 'user_id', 'transaction_id', 'quantity', 'price', 'category', 'created_at']
+Event = namedtuple('Event', EVENT_COLUMNS)
+
+
+def log_event(kind, product_id, quantity=None, price=None, user_id=None):
+    """Append one stock or price event to the current database transaction"""
+    db.session.add(SalesEvent(kind=kind, product_id=product_id, quantity=quantity, price=price, user_id=user_id))
+
+
+def log_sales(transaction, products, cart):
+    """Append a sale event per line of a just-flushed transaction; products maps id to Product"""
+    db.session.execute(insert(SalesEvent), [
+        {
+            'kind': SALE,
+            'product_id': item['product_id'],
+            'user_id': transaction.cashier_id,
+            'transaction_id': transaction.id,
+            'quantity': item['quantity'],
+            'price': to_money(item['unit_price']),
+            'category': products[item['product_id']].category,
+            'created_at': transaction.date_created
+        }
+        for item in cart
+    ])
+
+
+def log_products(kind, *criteria, user_id=None):
+    """Append a count (or price) event for every product matching criteria, from its current row"""
+    held = (
+        select(StockReservation.product_id, func.sum(StockReservation.quantity).label('quantity'))
+        .group_by(StockReservation.product_id)
+        .subquery()
+    )
+    on_hand = Product.stock_quantity + func.coalesce(held.c.quantity, 0) if kind == COUNT else null()
+    source = (
+        select(
+            literal(kind), Product.id, literal(user_id, Integer), null(), on_hand,
+            type_coerce(Product.price, Integer),  # already cents
+            null(), literal(datetime.utcnow())
+        )
+        .outerjoin(held, held.c.product_id == Product.id)
+        .where(*criteria)
+        .order_by(Product.id)
+    )
+    return db.session.execute(insert(SalesEvent).from_select(EVENT_COLUMNS, source)).rowcount
+
+
+def backfill_events():
+    """Seed an empty log from history: every past sale line, then a count of every product.
+
+    Past sales are logged under their product's current category, the same
+    one the rollup backfill uses. Returns (sale events, count events) written.
+    """
+    if db.session.query(SalesEvent.id).first() is not None:
+        raise ValueError('the sales event log already has events')
+
+    sales = db.session.execute(insert(SalesEvent).from_select(EVENT_COLUMNS, (
+        select(
+            literal(SALE), Sale.product_id, Transaction.cashier_id, Sale.transaction_id, Sale.quantity,
+            type_coerce(Sale.unit_price, Integer), Product.category, Transaction.date_created
+        )
+        .join(Transaction, Transaction.id == Sale.transaction_id)
+        .join(Product, Product.id == Sale.product_id)
+        .order_by(Transaction.date_created, Sale.id)
+    ))).rowcount
+    # Counted after the sales, so replaying stock starts from today's levels
+    counts = log_products(COUNT)
+    db.session.commit()
+    return sales, counts
+
+
+def stream_events(batch_size=10000):
+    """Yield every event in log order, reading batch_size rows at a time.
+
+    Events are Event tuples with price in integer cents, which keeps
+    replaying millions of them free of Decimal arithmetic and ORM overhead.
+    """
+    table = SalesEvent.__table__
+    query = (
+        select(*[
+            type_coerce(table.c.price, Integer).label('price') if name == 'price' else table.c[name]
+            for name in EVENT_COLUMNS
+        ])
+        .order_by(table.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from map(Event._make, db.session.connection().execute(query))
+
+
+class StockProjection:
+    """Stock levels and selling prices on Product.
+
+    Products never counted in the log are left as they are; the stock of a
+    counted product is what the log says is on hand, less the units open
+    carts hold right now.
+    """
+
+    def start(self):
+        self.on_hand = {}
+        self.prices = {}
+
+    def apply(self, event):
+        if event.kind == COUNT:
+            self.on_hand[event.product_id] = event.quantity
+        elif event.kind in (SALE, RESTOCK, ADJUST) and event.product_id in self.on_hand:
+            sign = -1 if event.kind == SALE else 1
+            self.on_hand[event.product_id] += sign * event.quantity
+
+        if event.kind in (COUNT, PRICE) and event.price is not None:
+            self.prices[event.product_id] = event.price
+
+    def finish(self):
+        existing = set(db.session.scalars(select(Product.id)))
+        held = dict(db.session.execute(
+            select(StockReservation.product_id, func.sum(StockReservation.quantity))
+            .group_by(StockReservation.product_id)
+        ).all())
+        stock_rows = [
+            {'id': product_id, 'stock_quantity': quantity - held.get(product_id, 0)}
+            for product_id, quantity in self.on_hand.items() if product_id in existing
+        ]
+        price_rows = [
+            {'id': product_id, 'price': from_cents(price)}
+            for product_id, price in self.prices.items() if product_id in existing
+        ]
+        if stock_rows:
+            db.session.execute(update(Product), stock_rows)
+        if price_rows:
+            db.session.execute(update(Product), price_rows)
+        catalog.bump()
+        stats_cache.invalidate(PRODUCT_STATS)
+        return len(stock_rows)
+
+
+class RollupProjection:
+    """daily_sales_rollup, from the sale events; flushed every flush_rows keys"""
+
+    def __init__(self, flush_rows=20000):
+        self.flush_rows = flush_rows
+
+    def start(self):
+        db.session.execute(delete(DailySalesRollup))
+        self.categories = dict(db.session.execute(select(Product.id, Product.category)).all())
+        self.rows = {}
+
+    def apply(self, event):
+        if event.kind != SALE or event.product_id not in self.categories:
+            return  # deleted products have no rollup rows
+        # Events logged before categories were recorded fall back to today's
+        category = event.category or self.categories[event.product_id]
+        key = (event.created_at.date(), event.user_id, category, event.product_id)
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = [0, 0, 0]  # quantity, revenue and VAT in cents
+        line_total = event.price * event.quantity
+        row[0] += event.quantity
+        row[1] += line_total
+        row[2] += vat_cents(line_total)
+        if len(self.rows) >= self.flush_rows:
+            self._flush()
+
+    def _flush(self):
+        # Increments, so a key seen again after a flush adds onto its row
+        upsert_increment(
+            DailySalesRollup,
+            [
+                {
+                    'sale_date': sale_date,
+                    'cashier_id': cashier_id,
+                    'category': category,
+                    'product_id': product_id,
+                    'quantity': quantity,
+                    'revenue': from_cents(revenue),
+                    'vat_amount': from_cents(vat)
+                }
+                for (sale_date, cashier_id, category, product_id), (quantity, revenue, vat) in self.rows.items()
+            ],
+            key_columns=('sale_date', 'cashier_id', 'category', 'product_id'),
+            counter_columns=('quantity', 'revenue', 'vat_amount')
+        )
+        self.rows = {}
+
+    def finish(self):
+        self._flush()
+        return db.session.query(func.count(DailySalesRollup.id)).scalar()
+
+
+class ShiftTotalsProjection:
+    """cashier_shift_totals, from the sale events"""
+
+    def start(self):
+        db.session.execute(delete(CashierShiftTotals))
+        self.rows = {}
+
+    def apply(self, event):
+        if event.kind != SALE:
+            return
+        key = (event.user_id, event.created_at.date())
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = [set(), 0, 0]  # transaction ids, lines, grand total in cents
+        line_total = event.price * event.quantity
+        row[0].add(event.transaction_id)
+        row[1] += 1
+        row[2] += line_total + vat_cents(line_total)
+
+    def finish(self):
+        rows = [
+            {
+                'cashier_id': cashier_id,
+                'shift_date': shift_date,
+                'transactions': len(transaction_ids),
+                'items': items,
+                'grand_total': from_cents(grand_total)
+            }
+            for (cashier_id, shift_date), (transaction_ids, items, grand_total) in self.rows.items()
+        ]
+        if rows:
+            db.session.execute(insert(CashierShiftTotals), rows)
+        return len(rows)
+
+
+PROJECTIONS = {
+    'stock': StockProjection,
+    'rollup': RollupProjection,
+    'shifts': ShiftTotalsProjection,
+}
+
+
+def check_log_complete():
+    """Raise ValueError unless the log holds sale events for every recorded transaction"""
+    recorded = db.session.query(func.count(Transaction.id)).scalar()
+    logged = db.session.query(func.count(func.distinct(SalesEvent.transaction_id))) \
+        .filter(SalesEvent.kind == SALE).scalar()
+    if logged < recorded:
+        hint = 'run `flask events backfill` first' if logged == 0 else \
+            'they were recorded without logging events, so replaying would lose them'
+        raise ValueError(f'the sales event log covers {logged} of {recorded} transactions; {hint}')
+
+
+def rebuild(names=tuple(PROJECTIONS), batch_size=10000):
+    """Replay the whole log into the named projections in one pass and one transaction.
+
+    Returns {name: rows written}. Raises ValueError, before writing
+    anything, if the log is missing the sales of any transaction.
+    """
+    check_log_complete()
+    projections = {name: PROJECTIONS[name]() for name in names}
+    try:
+        for projection in projections.values():
+            projection.start()
+        for event in stream_events(batch_size):
+            for projection in projections.values():
+                projection.apply(event)
+        written = {name: projection.finish() for name, projection in projections.items()}
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return written
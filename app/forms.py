@@ -1,5 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, SelectField, FloatField, IntegerField
+from wtforms import StringField, PasswordField, SubmitField, SelectField, DecimalField, IntegerField
+from wtforms.widgets import HiddenInput
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, Optional, NumberRange
 from app.models import User, Product
 
@@ -58,7 +59,7 @@ class AddProductForm(FlaskForm):
     product_code = StringField('Product Code', validators=[DataRequired(), Length(min=2, max=20)])
     name = StringField('Product Name', validators=[DataRequired(), Length(min=2, max=100)])
     category = StringField('Category', validators=[DataRequired(), Length(min=2, max=50)])
-    price = FloatField('Price (ZAR)', validators=[DataRequired(), NumberRange(min=0.01)])
+    price = DecimalField('Price (ZAR)', places=2, validators=[DataRequired(), NumberRange(min=0.01)])
     stock_quantity = IntegerField('Stock Quantity', validators=[DataRequired(), NumberRange(min=0)])
     submit = SubmitField('Add Product')
 
@@ -71,8 +72,9 @@ class EditProductForm(FlaskForm):
     product_code = StringField('Product Code', validators=[DataRequired(), Length(min=2, max=20)])
     name = StringField('Product Name', validators=[DataRequired(), Length(min=2, max=100)])
     category = StringField('Category', validators=[DataRequired(), Length(min=2, max=50)])
-    price = FloatField('Price (ZAR)', validators=[DataRequired(), NumberRange(min=0.01)])
+    price = DecimalField('Price (ZAR)', places=2, validators=[DataRequired(), NumberRange(min=0.01)])
     stock_quantity = IntegerField('Stock Quantity', validators=[DataRequired(), NumberRange(min=0)])
+    original_stock = IntegerField(widget=HiddenInput(), validators=[Optional()])  # stock when the form was opened
     submit = SubmitField('Update Product')
 
     def validate_product_code(self, product_code):
@@ -0,0 +1,193 @@
+"""
+Opt-in per-route instrumentation.
+
+When INSTRUMENTATION_ENABLED is set, every request records its SQL
+statement count, database time, template render time and total latency.
+Per-request figures go out in a Server-Timing response header (visible in
+the browser dev tools); per-endpoint aggregates are served in Prometheus
+text format at /metrics, to METRICS_TOKEN bearers or, without a token,
+to logged-in administrators.
+
+Aggregates are per process: behind several gunicorn workers a scrape
+sees the counters of whichever worker served it.
+"""
+
+import hmac
+import threading
+import time
+from collections import defaultdict
+from flask import Response, abort, current_app, g, has_request_context, request
+from flask import request_started, request_finished, before_render_template, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from app import db
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'queries', 'db_seconds', 'template_seconds', 'seconds', 'buckets', 'statuses')
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.statuses = defaultdict(int)
+
+
+class Instrumentation:
+    """Flask extension collecting query count and latency per endpoint"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(EndpointStats)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.setdefault('INSTRUMENTATION_ENABLED', False):
+            return
+        app.config.setdefault('METRICS_TOKEN', None)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        request_started.connect(self._request_started, app)
+        before_render_template.connect(self._before_render_template, app)
+        template_rendered.connect(self._template_rendered, app)
+        request_finished.connect(self._request_finished, app)
+        app.after_request(self._add_server_timing)
+
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.extensions['instrumentation'] = self
+
+    # --- per-request collection ---
+
+    def _request_started(self, sender, **extra):
+        g.instrumentation = {
+            'start': time.perf_counter(),
+            'queries': 0,
+            'db_seconds': 0.0,
+            'template_seconds': 0.0,
+            'template_start': None,
+        }
+
+    @staticmethod
+    def _current():
+        if has_request_context():
+            return g.get('instrumentation')
+        return None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        current = self._current()
+        if current is not None:
+            current['queries'] += 1
+            current['db_seconds'] += elapsed
+
+    def _before_render_template(self, sender, template, context, **extra):
+        current = self._current()
+        if current is not None:
+            current['template_start'] = time.perf_counter()
+
+    def _template_rendered(self, sender, template, context, **extra):
+        current = self._current()
+        if current is not None and current['template_start'] is not None:
+            current['template_seconds'] += time.perf_counter() - current['template_start']
+            current['template_start'] = None
+
+    def _add_server_timing(self, response):
+        current = self._current()
+        if current is not None:
+            total = time.perf_counter() - current['start']
+            response.headers.add('Server-Timing', ', '.join([
+                f'db;dur={current["db_seconds"] * 1000:.2f};desc="{current["queries"]} queries"',
+                f'tpl;dur={current["template_seconds"] * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ]))
+        return response
+
+    def _request_finished(self, sender, response, **extra):
+        current = self._current()
+        if current is None:
+            return
+        total = time.perf_counter() - current['start']
+        endpoint = request.endpoint or 'unmatched'
+
+        with self._lock:
+            stats = self._stats[endpoint]
+            stats.requests += 1
+            stats.queries += current['queries']
+            stats.db_seconds += current['db_seconds']
+            stats.template_seconds += current['template_seconds']
+            stats.seconds += total
+            stats.statuses[response.status_code] += 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if total <= bound:
+                    stats.buckets[i] += 1
+                    break
+
+    # --- exposition ---
+
+    def render_metrics(self):
+        """Return the collected metrics in Prometheus text exposition format"""
+        with self._lock:
+            snapshot = sorted(self._stats.items())
+            lines = [
+                '# HELP pos_requests_total Requests handled, by endpoint and status.',
+                '# TYPE pos_requests_total counter',
+            ]
+            for endpoint, stats in snapshot:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'pos_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP pos_request_duration_seconds Total request latency.',
+                '# TYPE pos_request_duration_seconds histogram',
+            ]
+            for endpoint, stats in snapshot:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'pos_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'pos_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {stats.requests}')
+                lines.append(f'pos_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats.seconds:.6f}')
+                lines.append(f'pos_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats.requests}')
+
+            for name, attribute, help_text in (
+                ('pos_db_queries_total', 'queries', 'SQL statements executed.'),
+                ('pos_db_duration_seconds_total', 'db_seconds', 'Time spent executing SQL.'),
+                ('pos_template_duration_seconds_total', 'template_seconds', 'Time spent rendering templates.'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for endpoint, stats in snapshot:
+                    value = getattr(stats, attribute)
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        """Prometheus scrape endpoint; requires METRICS_TOKEN as a bearer token
+        when set, otherwise a logged-in administrator"""
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(supplied, token):
+                abort(401)
+        elif not current_user.is_authenticated:
+            abort(401)
+        elif current_user.role != 'admin':
+            abort(403)
+        return Response(self.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+instrumentation = Instrumentation()
@@ -1,10 +1,24 @@
-from flask import render_template, redirect, url_for, flash, jsonify, request, session
+from flask import render_template, redirect, url_for, flash, jsonify, request, abort, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
-from app import db, bcrypt
-from app.models import User, Product, Transaction, Sale
+from app import db, carts
+from app.models import User, Product, Transaction, Sale, CashierShiftTotals
 from app.forms import AddUserForm, EditUserForm, AddProductForm, EditProductForm, SearchProductForm, AddToCartForm, CheckoutForm
 from app.main import bp
+from app.catalog import catalog
+from app.checkout import complete_sale, cart_totals
+from app.reservations import reserve, release, adjust_stock, InsufficientStockError
+from app.reports import sales_report, transaction_count
+from app.exports import stream_export, LEVELS as EXPORT_LEVELS, FORMATS as EXPORT_FORMATS
+from app.search import search_products
+from app.user_cache import user_cache
+from app.pagination import keyset_page
+from app.till import sync_sales
+from app.events import log_event, COUNT, RESTOCK, ADJUST, PRICE
+from app.stats import stats_cache, user_counts, product_counts, USER_STATS, PRODUCT_STATS
+from app.passwords import passwords, HashingBusy
+from app.utils import to_money
 from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload
 
 @bp.route('/')
 def landing():
@@ -22,15 +36,9 @@ def admin_dashboard():
         flash('Access denied: Administrator access required.', 'danger')
         return redirect(url_for('auth.login'))
     
-    total_users = User.query.count()
-    total_admins = User.query.filter_by(role='admin').count()
-    total_cashiers = User.query.filter_by(role='staff').count()
-    
     return render_template("admin_dashboard.html", 
                          user=current_user,
-                         total_users=total_users,
-                         total_admins=total_admins,
-                         total_cashiers=total_cashiers)
+                         **user_counts())
 
 @bp.route('/sales_reports')
 @login_required
@@ -60,17 +68,34 @@ def sales_reports():
     if cashier_id:
         query = query.filter(Transaction.cashier_id == cashier_id)
     
-    transactions = query.order_by(Transaction.date_created.desc()).all()
-    
-    # Filter by category if specified
+    # Filter by category if specified (EXISTS over the transaction's sale lines)
     if category:
-        transactions = [t for t in transactions if any(sale.product.category == category for sale in t.sales)]
+        query = query.filter(
+            db.session.query(Sale.id)
+            .join(Product, Product.id == Sale.product_id)
+            .filter(Sale.transaction_id == Transaction.id, Product.category == category)
+            .exists()
+        )
     
-    # Calculate summary stats
-    total_revenue = sum(t.grand_total for t in transactions) if transactions else 0.0
-    total_vat = sum(t.vat_amount for t in transactions) if transactions else 0.0
-    total_items = sum(sum(s.quantity for s in t.sales) for t in transactions) if transactions else 0
-    total_transactions = len(transactions)
+    # Summary stats and chart series come from the daily sales rollup and the
+    # transaction count from the shift totals (which know nothing of
+    # categories, so a category filter still counts the transactions)
+    report = sales_report(start_datetime.date(), end_datetime.date(), cashier_id, category)
+    summary = report['summary']
+    if category:
+        total_transactions = query.order_by(None).count()
+    else:
+        total_transactions = transaction_count(start_datetime.date(), end_datetime.date(), cashier_id)
+    
+    # The table shows one page of the range, newest first
+    transactions = keyset_page(
+        query.options(
+            joinedload(Transaction.cashier),
+            selectinload(Transaction.sales).joinedload(Sale.product)
+        ),
+        [Transaction.date_created, Transaction.id],
+        request.args.get('cursor'), per_page=50, descending=True, total=total_transactions
+    )
     
     # Get all cashiers for filter dropdown
     cashiers = User.query.filter_by(role='staff').all()
@@ -82,21 +107,22 @@ def sales_reports():
     return render_template('sales_reports.html',
                          user=current_user,
                          transactions=transactions,
-                         total_revenue=total_revenue,
-                         total_vat=total_vat,
-                         total_items=total_items,
+                         total_revenue=summary['total_revenue'],
+                         total_vat=summary['total_vat'],
+                         total_items=summary['total_items'],
                          total_transactions=total_transactions,
                          cashiers=cashiers,
                          categories=categories,
                          start_date=start_date,
                          end_date=end_date,
                          cashier_id=cashier_id,
-                         selected_category=category)
+                         selected_category=category,
+                         report=report)
 
 @bp.route('/sales_reports_data')
 @login_required
 def sales_reports_data():
-    """API endpoint for chart data"""
+    """API endpoint for chart data (chart_type=all returns every chart at once)"""
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
@@ -108,84 +134,47 @@ def sales_reports_data():
     chart_type = request.args.get('chart_type', 'daily')
     
     # Parse dates
-    start_datetime = datetime.fromisoformat(start_date)
-    end_datetime = datetime.fromisoformat(end_date).replace(hour=23, minute=59, second=59)
+    start = datetime.fromisoformat(start_date).date()
+    end = datetime.fromisoformat(end_date).date()
     
-    # Build query
-    query = Transaction.query.filter(
-        Transaction.date_created >= start_datetime,
-        Transaction.date_created <= end_datetime
-    )
+    if chart_type not in ('all', 'daily', 'category', 'products'):
+        return jsonify({'error': 'Invalid chart type'}), 400
     
-    if cashier_id:
-        query = query.filter(Transaction.cashier_id == cashier_id)
+    # All chart series are built from a single rollup query
+    report = sales_report(start, end, cashier_id, category)
     
-    transactions = query.all()
+    if chart_type == 'all':
+        return jsonify(report)
     
-    # Filter by category if specified
-    if category:
-        transactions = [t for t in transactions if any(sale.product.category == category for sale in t.sales)]
-    
-    if chart_type == 'daily':
-        # Daily sales chart data
-        daily_data = {}
-        for t in transactions:
-            date_key = t.date_created.date().isoformat()
-            if date_key not in daily_data:
-                daily_data[date_key] = 0.0
-            daily_data[date_key] += t.grand_total
-        
-        sorted_dates = sorted(daily_data.keys())
-        labels = sorted_dates
-        data = [daily_data[d] for d in sorted_dates]
-        
-        return jsonify({
-            'labels': labels,
-            'data': data,
-            'title': 'Daily Sales'
-        })
+    return jsonify(report[chart_type])
+
+@bp.route('/export_sales')
+@login_required
+def export_sales():
+    """Stream transactions or sale lines as CSV or JSON Lines"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
     
-    elif chart_type == 'category':
-        # Category distribution (pie chart)
-        category_data = {}
-        for t in transactions:
-            for sale in t.sales:
-                cat = sale.product.category
-                if cat not in category_data:
-                    category_data[cat] = 0.0
-                category_data[cat] += sale.line_total
-        
-        labels = list(category_data.keys())
-        data = list(category_data.values())
-        
-        return jsonify({
-            'labels': labels,
-            'data': data,
-            'title': 'Sales by Category'
-        })
+    level = request.args.get('level', 'transactions')
+    fmt = request.args.get('format', 'csv')
+    if level not in EXPORT_LEVELS or fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Invalid export level or format'}), 400
     
-    elif chart_type == 'products':
-        # Top products (pie chart)
-        product_data = {}
-        for t in transactions:
-            for sale in t.sales:
-                prod = sale.product.name
-                if prod not in product_data:
-                    product_data[prod] = 0
-                product_data[prod] += sale.quantity
-        
-        # Sort and get top 10
-        sorted_products = sorted(product_data.items(), key=lambda x: x[1], reverse=True)[:10]
-        labels = [p[0] for p in sorted_products]
-        data = [p[1] for p in sorted_products]
-        
-        return jsonify({
-            'labels': labels,
-            'data': data,
-            'title': 'Top 10 Products by Quantity'
-        })
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.fromisoformat(start_date).date() if start_date else None
+        end_date = datetime.fromisoformat(end_date).date() if end_date else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    cashier_id = request.args.get('cashier_id', type=int)
     
-    return jsonify({'error': 'Invalid chart type'}), 400
+    filename = f"{level}_{start_date or 'start'}_{end_date or 'today'}.{fmt}"
+    return Response(
+        stream_with_context(stream_export(level, fmt, start_date, end_date, cashier_id)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 @bp.route('/staff_dashboard')
 @login_required
@@ -194,24 +183,15 @@ def staff_dashboard():
         flash('Access denied: Cashier access required.', 'danger')
         return redirect(url_for('auth.login'))
     
-    # Get today's transactions for this cashier
-    from datetime import date
-    today = date.today()
-    today_transactions = Transaction.query.filter(
-        Transaction.cashier_id == current_user.id,
-        Transaction.date_created >= datetime(today.year, today.month, today.day)
-    ).all()
-    
-    # Calculate summary stats
-    total_transactions = len(today_transactions)
-    total_sales = sum(t.grand_total for t in today_transactions) if today_transactions else 0.0
-    total_items = sum(len(t.sales) for t in today_transactions) if today_transactions else 0
+    # Today's running totals for this cashier, kept up to date at checkout
+    # (days follow Transaction.date_created, which is UTC)
+    totals = db.session.get(CashierShiftTotals, (current_user.id, datetime.utcnow().date()))
     
     return render_template("staff_dashboard.html", 
                          user=current_user,
-                         total_transactions=total_transactions,
-                         total_sales=total_sales,
-                         total_items=total_items)
+                         total_transactions=totals.transactions if totals else 0,
+                         total_sales=totals.grand_total if totals else 0.0,
+                         total_items=totals.items if totals else 0)
 
 # ===== USER MANAGEMENT ROUTES =====
 
@@ -223,8 +203,8 @@ def manage_users():
         flash('Access denied: Administrator access required.', 'danger')
         return redirect(url_for('auth.login'))
     
-    page = request.args.get('page', 1, type=int)
-    users = User.query.paginate(page=page, per_page=10)
+    users = keyset_page(User.query, [User.id], request.args.get('cursor'), per_page=10,
+                        total=user_counts()['total_users'])
     
     return render_template('manage_users.html', 
                          users=users,
@@ -240,7 +220,11 @@ def add_user():
     
     form = AddUserForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        try:
+            hashed_password = passwords.hash(form.password.data)
+        except HashingBusy:
+            flash('The system is busy. Please try again in a moment.', 'danger')
+            return render_template('add_user.html', form=form, user=current_user), 503
         new_user = User(
             name=form.name.data,
             email=form.email.data,
@@ -249,6 +233,7 @@ def add_user():
         )
         
         db.session.add(new_user)
+        stats_cache.invalidate(USER_STATS)
         db.session.commit()
         
         flash(f'User "{form.name.data}" has been added successfully!', 'success')
@@ -275,9 +260,16 @@ def edit_user(user_id):
         
         # Only update password if a new one was provided
         if form.password.data:
-            user_to_edit.password_hash = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+            try:
+                user_to_edit.password_hash = passwords.hash(form.password.data)
+            except HashingBusy:
+                db.session.rollback()
+                flash('The system is busy. Please try again in a moment.', 'danger')
+                return render_template('edit_user.html', form=form, user=current_user, user_to_edit=user_to_edit), 503
         
+        stats_cache.invalidate(USER_STATS)
         db.session.commit()
+        user_cache.invalidate(user_id)
         flash(f'User "{user_to_edit.name}" has been updated successfully!', 'success')
         return redirect(url_for('main.manage_users'))
     
@@ -305,7 +297,9 @@ def delete_user(user_id):
     
     user_name = user_to_delete.name
     db.session.delete(user_to_delete)
+    stats_cache.invalidate(USER_STATS)
     db.session.commit()
+    user_cache.invalidate(user_id)
     
     flash(f'User "{user_name}" has been deleted successfully!', 'success')
     return redirect(url_for('main.manage_users'))
@@ -317,15 +311,7 @@ def user_stats():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    total_users = User.query.count()
-    total_admins = User.query.filter_by(role='admin').count()
-    total_cashiers = User.query.filter_by(role='staff').count()
-    
-    return jsonify({
-        'total_users': total_users,
-        'total_admins': total_admins,
-        'total_cashiers': total_cashiers
-    })
+    return jsonify(user_counts())
 
 
 # ===== PRODUCT MANAGEMENT ROUTES =====
@@ -338,16 +324,14 @@ def manage_products():
         flash('Access denied: Administrator access required.', 'danger')
         return redirect(url_for('auth.login'))
     
-    page = request.args.get('page', 1, type=int)
-    products = Product.query.paginate(page=page, per_page=10)
-    
-    # Count low stock products
-    low_stock_count = Product.query.filter(Product.stock_quantity < 10).count()
+    counts = product_counts()
+    products = keyset_page(Product.query, [Product.id], request.args.get('cursor'), per_page=10,
+                           total=counts['total_products'])
     
     return render_template('manage_products.html', 
                          products=products,
                          user=current_user,
-                         low_stock_count=low_stock_count)
+                         low_stock_count=counts['low_stock_products'])
 
 @bp.route('/add_product', methods=['GET', 'POST'])
 @login_required
@@ -368,6 +352,10 @@ def add_product():
         )
         
         db.session.add(new_product)
+        db.session.flush()  # Get product ID
+        log_event(COUNT, new_product.id, new_product.stock_quantity, new_product.price, current_user.id)
+        catalog.bump()
+        stats_cache.invalidate(PRODUCT_STATS)
         db.session.commit()
         
         flash(f'Product "{form.name.data}" has been added successfully!', 'success')
@@ -388,12 +376,36 @@ def edit_product(product_id):
     form.product_id = product_id
     
     if form.validate_on_submit():
+        # The admin's change is measured from the stock shown when the form
+        # was opened, so units that tills reserve or release meanwhile are
+        # kept rather than overwritten
+        original_stock = form.original_stock.data
+        if original_stock is None:
+            original_stock = product_to_edit.stock_quantity
+        stock_added = form.stock_quantity.data - original_stock
+        if stock_added:
+            log_event(ADJUST, product_id, stock_added, user_id=current_user.id)
+        if to_money(form.price.data) != product_to_edit.price:
+            log_event(PRICE, product_id, price=form.price.data, user_id=current_user.id)
+        catalog_changed = (
+            (product_to_edit.product_code, product_to_edit.name, product_to_edit.category, product_to_edit.price)
+            != (form.product_code.data, form.name.data, form.category.data, to_money(form.price.data))
+        )
         product_to_edit.product_code = form.product_code.data
         product_to_edit.name = form.name.data
         product_to_edit.category = form.category.data
         product_to_edit.price = form.price.data
-        product_to_edit.stock_quantity = form.stock_quantity.data
+        # Fails only when tills took units since the form was opened and
+        # fewer are left than the change takes away
+        if not adjust_stock(product_id, -stock_added):
+            db.session.rollback()
+            flash(f'Stock of "{product_to_edit.name}" dropped to {product_to_edit.stock_quantity} while you were editing; '
+                  'please check it and try again.', 'danger')
+            return redirect(url_for('main.edit_product', product_id=product_id))
         
+        if catalog_changed:
+            catalog.bump()
+        stats_cache.invalidate(PRODUCT_STATS)
         db.session.commit()
         flash(f'Product "{product_to_edit.name}" has been updated successfully!', 'success')
         return redirect(url_for('main.manage_products'))
@@ -404,6 +416,7 @@ def edit_product(product_id):
         form.category.data = product_to_edit.category
         form.price.data = product_to_edit.price
         form.stock_quantity.data = product_to_edit.stock_quantity
+        form.original_stock.data = product_to_edit.stock_quantity
     
     return render_template('edit_product.html', form=form, user=current_user, product_to_edit=product_to_edit)
 
@@ -419,6 +432,8 @@ def delete_product(product_id):
     product_name = product_to_delete.name
     
     db.session.delete(product_to_delete)
+    catalog.bump()
+    stats_cache.invalidate(PRODUCT_STATS)
     db.session.commit()
     
     flash(f'Product "{product_name}" has been deleted successfully!', 'success')
@@ -438,7 +453,9 @@ def restock_product(product_id):
         return jsonify({'error': 'Invalid quantity'}), 400
     
     try:
-        product.stock_quantity += quantity
+        adjust_stock(product.id, -quantity)
+        log_event(RESTOCK, product.id, quantity, user_id=current_user.id)
+        stats_cache.invalidate(PRODUCT_STATS)
         db.session.commit()
         
         flash(f'Added {quantity} units to "{product.name}". New stock: {product.stock_quantity}', 'success')
@@ -455,20 +472,19 @@ def product_stats():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    total_products = Product.query.count()
-    low_stock_products = Product.query.filter(Product.stock_quantity < 10).count()
-    total_stock_value = db.session.query(db.func.sum(Product.price * Product.stock_quantity)).scalar() or 0
-    
-    return jsonify({
-        'total_products': total_products,
-        'low_stock_products': low_stock_products,
-        'total_stock_value': round(float(total_stock_value), 2)
-    })
+    return jsonify(product_counts())
 
 
 # ===== SALES & BILLING ROUTES =====
 
-@bp.route('/pos')
+PRODUCT_ROW_FIELDS = ['id', 'product_code', 'name', 'category', 'price', 'stock_quantity']
+
+def product_row(product):
+    """Compact list form of a product for the POS grid"""
+    return [product.id, product.product_code, product.name, product.category,
+            float(product.price), product.stock_quantity]
+
+@bp.route('/pos', methods=['GET', 'POST'])
 @login_required
 def pos():
     """Point of Sale interface for cashiers"""
@@ -476,38 +492,106 @@ def pos():
         flash('Access denied: Cashier access required.', 'danger')
         return redirect(url_for('auth.login'))
     
-    # Initialize cart in session if not exists
-    if 'cart' not in session:
-        session['cart'] = []
-    
     form = SearchProductForm()
     search_results = []
+    next_cursor = None
     
-    # Search for products
+    # Search for products (ranked prefix match on the search index)
     if form.validate_on_submit() and form.search_query.data:
-        search_query = form.search_query.data.lower()
-        search_results = Product.query.filter(
-            (Product.name.ilike(f'%{search_query}%')) |
-            (Product.product_code.ilike(f'%{search_query}%'))
-        ).all()
+        search_results = search_products(form.search_query.data, limit=100)
     else:
-        # Show all products if no search
-        search_results = Product.query.all()
+        # Show the first page of the catalog; the rest is loaded from /api/products
+        after = request.args.get('after', type=int)
+        search_results, next_cursor = catalog.page(after, current_app.config['POS_PAGE_SIZE'])
     
     # Calculate cart totals
-    subtotal = sum(item['unit_price'] * item['quantity'] for item in session.get('cart', []))
-    vat = subtotal * 0.15  # 15% VAT
-    grand_total = subtotal + vat
+    cart = carts.items()
+    subtotal, vat, grand_total = cart_totals(cart)
     
     return render_template('pos.html', 
                          products=search_results,
+                         product_rows=[product_row(product) for product in search_results] if next_cursor else [],
+                         next_cursor=next_cursor,
                          form=form,
-                         cart=session.get('cart', []),
+                         cart=cart,
                          subtotal=subtotal,
                          vat=vat,
                          grand_total=grand_total,
                          user=current_user)
 
+@bp.route('/api/products')
+@login_required
+def product_page():
+    """One page of the catalog as compact rows, for the POS grid"""
+    if current_user.role != 'staff':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    after = request.args.get('after', type=int)
+    limit = min(max(request.args.get('limit', current_app.config['POS_PAGE_SIZE'], type=int), 1), 500)
+    products, next_cursor = catalog.page(after, limit)
+    
+    return jsonify({
+        'fields': PRODUCT_ROW_FIELDS,
+        'rows': [product_row(product) for product in products],
+        'next': next_cursor
+    })
+
+@bp.route('/api/products/search')
+@login_required
+def product_search():
+    """Typeahead: top matching products as JSON"""
+    if current_user.role != 'staff':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    products = search_products(query, limit=limit)
+    
+    return jsonify([{
+        'id': product.id,
+        'product_code': product.product_code,
+        'name': product.name,
+        'price': float(product.price),
+        'stock_quantity': product.stock_quantity
+    } for product in products])
+
+@bp.route('/api/till/catalog')
+@login_required
+def till_catalog():
+    """Whole catalog for an offline till; 304 when the till's copy is current"""
+    if current_user.role != 'staff':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    version, products = catalog.snapshot()
+    etag = f'catalog-{version}'
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({
+            'version': version,
+            'fields': PRODUCT_ROW_FIELDS,
+            'rows': [product_row(product) for product in products]
+        })
+    response.set_etag(etag)
+    return response
+
+@bp.route('/api/till/sync', methods=['POST'])
+@login_required
+def till_sync():
+    """Record a batch of sales queued by an offline till"""
+    if current_user.role != 'staff':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    # JSON only: a cross-site form cannot send it, which stands in for the CSRF token
+    payload = request.get_json(silent=True)
+    sales = payload.get('sales') if isinstance(payload, dict) else None
+    if not isinstance(sales, list):
+        return jsonify({'error': 'Expected a JSON body {"sales": [...]}'}), 400
+    if len(sales) > current_app.config['TILL_SYNC_MAX_BATCH']:
+        return jsonify({'error': f"At most {current_app.config['TILL_SYNC_MAX_BATCH']} sales per request"}), 413
+
+    return jsonify({'results': sync_sales(current_user.id, sales)})
+
 @bp.route('/add_to_cart/<int:product_id>', methods=['POST'])
 @login_required
 def add_to_cart(product_id):
@@ -515,48 +599,60 @@ def add_to_cart(product_id):
     if current_user.role != 'staff':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    product = Product.query.get_or_404(product_id)
+    product = catalog.get(product_id)
+    if product is None:
+        abort(404)
     quantity = request.form.get('quantity', 1, type=int)
     
     # Validate quantity
     if quantity < 1:
         return jsonify({'error': 'Quantity must be at least 1'}), 400
     
-    if quantity > product.stock_quantity:
-        return jsonify({'error': f'Insufficient stock. Available: {product.stock_quantity}'}), 400
-    
-    # Initialize cart if needed
-    if 'cart' not in session:
-        session['cart'] = []
-    
     # Check if product already in cart
-    cart_item = None
-    for item in session['cart']:
-        if item['product_id'] == product_id:
-            cart_item = item
-            break
+    cart_item = carts.get_line(product_id)
+    new_quantity = cart_item['quantity'] + quantity if cart_item else quantity
+    
+    # Hold the units for this cart until checkout
+    try:
+        reserve(carts.cart_id(), product, new_quantity)
+    except InsufficientStockError as e:
+        _, available = e.shortages[0]
+        return jsonify({'error': f'Insufficient stock. Available: {available}'}), 400
     
     if cart_item:
         # Update quantity
-        new_quantity = cart_item['quantity'] + quantity
-        if new_quantity > product.stock_quantity:
-            return jsonify({'error': f'Insufficient stock. Available: {product.stock_quantity}'}), 400
         cart_item['quantity'] = new_quantity
     else:
         # Add new item to cart
-        session['cart'].append({
+        cart_item = {
             'product_id': product_id,
             'product_code': product.product_code,
             'product_name': product.name,
             'unit_price': product.price,
             'quantity': quantity,
             'is_low_stock': product.is_low_stock()
-        })
+        }
     
-    session.modified = True
+    carts.put_line(cart_item)
     flash(f'{product.name} added to cart!', 'success')
     return redirect(url_for('main.pos'))
 
+@bp.route('/scan_product', methods=['POST'])
+@login_required
+def scan_product():
+    """Add item to shopping cart by scanned barcode / product code"""
+    if current_user.role != 'staff':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    product_code = request.form.get('product_code', '').strip()
+    product = catalog.get_by_code(product_code)
+    
+    if product is None:
+        flash(f'No product found with code "{product_code}".', 'danger')
+        return redirect(url_for('main.pos'))
+    
+    return add_to_cart(product.id)
+
 @bp.route('/update_cart/<int:product_id>', methods=['POST'])
 @login_required
 def update_cart(product_id):
@@ -565,21 +661,24 @@ def update_cart(product_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     quantity = request.form.get('quantity', 1, type=int)
-    product = Product.query.get_or_404(product_id)
+    product = catalog.get(product_id)
+    if product is None:
+        abort(404)
     
     if quantity < 1:
         return jsonify({'error': 'Quantity must be at least 1'}), 400
     
-    if quantity > product.stock_quantity:
-        flash(f'Insufficient stock. Available: {product.stock_quantity}', 'danger')
-        return redirect(url_for('main.pos'))
-    
-    for item in session.get('cart', []):
-        if item['product_id'] == product_id:
-            item['quantity'] = quantity
-            break
+    cart_item = carts.get_line(product_id)
+    if cart_item:
+        try:
+            reserve(carts.cart_id(), product, quantity)
+        except InsufficientStockError as e:
+            _, available = e.shortages[0]
+            flash(f'Insufficient stock. Available: {available}', 'danger')
+            return redirect(url_for('main.pos'))
+        cart_item['quantity'] = quantity
+        carts.put_line(cart_item)
     
-    session.modified = True
     flash(f'{product.name} quantity updated!', 'success')
     return redirect(url_for('main.pos'))
 
@@ -590,9 +689,11 @@ def remove_from_cart(product_id):
     if current_user.role != 'staff':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    product = Product.query.get_or_404(product_id)
-    session['cart'] = [item for item in session.get('cart', []) if item['product_id'] != product_id]
-    session.modified = True
+    product = catalog.get(product_id)
+    if product is None:
+        abort(404)
+    release(carts.cart_id(), product_id)
+    carts.remove_line(product_id)
     
     flash(f'{product.name} removed from cart!', 'success')
     return redirect(url_for('main.pos'))
@@ -604,8 +705,8 @@ def clear_cart():
     if current_user.role != 'staff':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    session['cart'] = []
-    session.modified = True
+    release(carts.cart_id())
+    carts.clear()
     
     flash('Cart cleared!', 'info')
     return redirect(url_for('main.pos'))
@@ -618,7 +719,7 @@ def checkout():
         flash('Access denied: Cashier access required.', 'danger')
         return redirect(url_for('auth.login'))
     
-    cart = session.get('cart', [])
+    cart = carts.items()
     
     if not cart:
         flash('Cart is empty. Add items before checkout.', 'danger')
@@ -628,61 +729,23 @@ def checkout():
     
     if form.validate_on_submit():
         try:
-            # Calculate totals
-            subtotal = sum(item['unit_price'] * item['quantity'] for item in cart)
-            vat = subtotal * 0.15  # 15% VAT
-            grand_total = subtotal + vat
-            
-            # Create transaction
-            transaction = Transaction(
-                cashier_id=current_user.id,
-                subtotal=subtotal,
-                vat_amount=vat,
-                grand_total=grand_total,
-                payment_method=form.payment_method.data,
-                status='completed'
-            )
-            
-            db.session.add(transaction)
-            db.session.flush()  # Get transaction ID
-            
-            # Create sales and update stock
-            for item in cart:
-                product = Product.query.get(item['product_id'])
-                
-                # Create sale record
-                sale = Sale(
-                    transaction_id=transaction.id,
-                    product_id=item['product_id'],
-                    quantity=item['quantity'],
-                    unit_price=item['unit_price'],
-                    line_total=item['unit_price'] * item['quantity']
-                )
-                
-                # Update product stock
-                product.stock_quantity -= item['quantity']
-                
-                db.session.add(sale)
-            
-            # Commit all changes
-            db.session.commit()
+            transaction = complete_sale(current_user.id, cart, form.payment_method.data, carts.cart_id())
             
             # Clear cart
-            session['cart'] = []
-            session.modified = True
+            carts.clear()
             
             flash('Sale completed successfully!', 'success')
             return redirect(url_for('main.receipt', transaction_id=transaction.id))
             
+        except InsufficientStockError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('main.pos'))
         except Exception as e:
-            db.session.rollback()
             flash(f'Error processing sale: {str(e)}', 'danger')
             return redirect(url_for('main.pos'))
     
     # Calculate totals for display
-    subtotal = sum(item['unit_price'] * item['quantity'] for item in cart)
-    vat = subtotal * 0.15
-    grand_total = subtotal + vat
+    subtotal, vat, grand_total = cart_totals(cart)
     
     return render_template('checkout.html',
                          form=form,
@@ -707,11 +770,9 @@ def receipt(transaction_id):
         flash('You can only view your own receipts.', 'danger')
         return redirect(url_for('main.pos'))
     
-    sales = Sale.query.filter_by(transaction_id=transaction_id).all()
-    
     return render_template('receipt.html',
                          transaction=transaction,
-                         sales=sales,
+                         sales=transaction.sales,
                          user=current_user)
 
 @bp.route('/sales_history')
@@ -722,12 +783,16 @@ def sales_history():
         flash('Access denied: Cashier access required.', 'danger')
         return redirect(url_for('auth.login'))
     
-    page = request.args.get('page', 1, type=int)
-    transactions = Transaction.query.filter(
-        Transaction.cashier_id == current_user.id
-    ).order_by(
-        Transaction.date_created.desc()
-    ).paginate(page=page, per_page=10)
+    # Seek on (date_created, id) through the cashier/date index; the total
+    # comes from the cashier's shift totals instead of a COUNT
+    total = db.session.query(
+        db.func.coalesce(db.func.sum(CashierShiftTotals.transactions), 0)
+    ).filter(CashierShiftTotals.cashier_id == current_user.id).scalar()
+    transactions = keyset_page(
+        Transaction.query.filter(Transaction.cashier_id == current_user.id),
+        [Transaction.date_created, Transaction.id],
+        request.args.get('cursor'), per_page=10, descending=True, total=total
+    )
     
     return render_template('sales_history.html',
                          transactions=transactions,
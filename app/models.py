@@ -1,5 +1,6 @@
 from flask import Flask
 from app import db
+from app.database import Money
 from flask_login import UserMixin
 from datetime import datetime
 
@@ -8,7 +9,7 @@ class User(db.Model, UserMixin):
     name = db.Column(db.String(20), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(60), nullable=False)
-    role = db.Column(db.String(20), default='staff')
+    role = db.Column(db.String(20), default='staff', index=True)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
@@ -19,12 +20,13 @@ class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     product_code = db.Column(db.String(20), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    category = db.Column(db.String(50), nullable=False)
-    price = db.Column(db.Float, nullable=False)
-    stock_quantity = db.Column(db.Integer, default=0)
+    category = db.Column(db.String(50), nullable=False, index=True)
+    price = db.Column(Money, nullable=False)
+    stock_quantity = db.Column(db.Integer, default=0, index=True)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
     date_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    sales = db.relationship('Sale', backref='product', lazy=True)
+    # A sale line is always shown with its product's name and code
+    sales = db.relationship('Sale', backref=db.backref('product', lazy='joined'), lazy=True)
 
     def __repr__(self):
         return f"<Product {self.name}>"
@@ -35,16 +37,25 @@ class Product(db.Model):
 
 
 class Transaction(db.Model):
+    __table_args__ = (
+        # staff dashboard, sales history and per-cashier reports
+        db.Index('ix_transaction_cashier_id_date_created', 'cashier_id', 'date_created'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     cashier_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     cashier = db.relationship('User', backref='transactions')
-    subtotal = db.Column(db.Float, nullable=False)
-    vat_amount = db.Column(db.Float, nullable=False)
-    grand_total = db.Column(db.Float, nullable=False)
+    subtotal = db.Column(Money, nullable=False)
+    vat_amount = db.Column(Money, nullable=False)
+    grand_total = db.Column(Money, nullable=False)
     payment_method = db.Column(db.String(20), default='cash')  # 'cash', 'card'
     status = db.Column(db.String(20), default='completed')  # 'completed', 'voided'
-    date_created = db.Column(db.DateTime, default=datetime.utcnow)
-    sales = db.relationship('Sale', backref='transaction', lazy=True, cascade='all, delete-orphan')
+    date_created = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    client_ref = db.Column(db.String(64), unique=True, index=True)  # idempotency key of a sale synced from an offline till
+    # Every page that lists transactions shows their lines or item counts:
+    # load the lines for a whole page of transactions in one extra query
+    sales = db.relationship('Sale', backref='transaction', lazy='selectin', order_by='Sale.id',
+                            cascade='all, delete-orphan')
 
     def __repr__(self):
         return f"<Transaction {self.id} - R{self.grand_total:.2f}>"
@@ -52,18 +63,114 @@ class Transaction(db.Model):
 
 class Sale(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
-    unit_price = db.Column(db.Float, nullable=False)
-    line_total = db.Column(db.Float, nullable=False)
+    unit_price = db.Column(Money, nullable=False)
+    line_total = db.Column(Money, nullable=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
         return f"<Sale {self.id} - {self.quantity}x {self.product.name}>"
 
 
+class StockReservation(db.Model):
+    """Units held for an open cart until checkout or expiry.
+
+    Reserving decrements Product.stock_quantity straight away, so
+    stock_quantity is what is still available to sell; checkout turns the
+    cart's reservations into sales and the sweeper returns expired ones.
+    """
+    __tablename__ = 'stock_reservation'
+    __table_args__ = (
+        db.UniqueConstraint('cart_id', 'product_id', name='uq_stock_reservation_cart_product'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    cart_id = db.Column(db.String(32), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<StockReservation {self.cart_id} - {self.product_id} x{self.quantity}>"
+
 
+class DailySalesRollup(db.Model):
+    """Pre-aggregated sales per day, cashier, category and product.
 
+    Updated incrementally by app.checkout.complete_sale and rebuilt with
+    `flask reports backfill`. Feeds the sales report cards and charts.
+    """
+    __tablename__ = 'daily_sales_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('sale_date', 'cashier_id', 'category', 'product_id', name='uq_daily_sales_rollup_key'),
+    )
 
+    id = db.Column(db.Integer, primary_key=True)
+    sale_date = db.Column(db.Date, nullable=False)
+    cashier_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product = db.relationship('Product')
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(Money, nullable=False, default=0)  # excluding VAT
+    vat_amount = db.Column(Money, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DailySalesRollup {self.sale_date} - {self.product_id} x{self.quantity}>"
+
+
+class CashierShiftTotals(db.Model):
+    """Running totals of each cashier's sales per day, for the staff dashboard.
+
+    Incremented by app.checkout.complete_sale and rebuilt with
+    `flask reports backfill`, so the dashboard reads a single row however
+    busy the shift has been.
+    """
+    __tablename__ = 'cashier_shift_totals'
+
+    cashier_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    shift_date = db.Column(db.Date, primary_key=True, index=True)
+    transactions = db.Column(db.Integer, nullable=False, default=0)
+    items = db.Column(db.Integer, nullable=False, default=0)  # sale lines
+    grand_total = db.Column(Money, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CashierShiftTotals {self.shift_date} - {self.cashier_id} x{self.transactions}>"
+
+
+class SalesEvent(db.Model):
+    """Append-only log of what happened to stock and prices, in id order.
+
+    Written alongside the live tables by checkout, restocks and product
+    edits; app.events replays it to rebuild stock levels, the daily sales
+    rollup and the cashier shift totals. Rows are never updated.
+    """
+    __tablename__ = 'sales_event'
+
+    id = db.Column(db.Integer, primary_key=True)  # log position
+    kind = db.Column(db.String(16), nullable=False)  # see app.events
+    # No foreign keys: the log outlives deleted products and users
+    product_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer)  # cashier for sales, admin for stock changes
+    transaction_id = db.Column(db.Integer)
+    quantity = db.Column(db.Integer)
+    price = db.Column(Money)
+    category = db.Column(db.String(50))  # the product's category when it was sold
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SalesEvent #{self.id} {self.kind} {self.product_id}>"
+
+
+class CacheVersion(db.Model):
+    """Version stamp shared by all workers for invalidating process-local caches"""
+    __tablename__ = 'cache_version'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name} v{self.version}>"
 
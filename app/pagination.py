@@ -0,0 +1,107 @@
+"""
+Keyset (seek) pagination for the long listings.
+
+Flask-SQLAlchemy's paginate() counts every matching row and skips the
+earlier pages with OFFSET, so each page costs more than the one before
+it. keyset_page() instead remembers the ordering key of the row a page
+ended on and asks for the rows after it:
+
+    WHERE (date_created, id) < (:date_created, :id)
+    ORDER BY date_created DESC, id DESC LIMIT :per_page + 1
+
+An index on the ordering columns answers that as quickly for the last page
+as for the first. The last ordering column must be unique (normally the
+primary key) so the key identifies exactly one row.
+
+Cursors are opaque, URL-safe strings; a missing or malformed cursor gives
+the first page. Pages carry no page number and no COUNT. Callers that want
+to show a total pass one in, usually a cached or precomputed count, and
+that total may trail the listing slightly.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, tuple_
+
+
+class KeysetPage:
+    """One page of rows plus the cursors for its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(key, backwards=False):
+    """Pack an ordering key into an opaque cursor string"""
+    payload = {'k': [value.isoformat() if isinstance(value, datetime) else value for value in key]}
+    if backwards:
+        payload['b'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Return (key, backwards) for a cursor, or (None, False) if it is missing or malformed"""
+    if not cursor:
+        return None, False
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = payload['k']
+        if len(values) != len(columns):
+            return None, False
+        key = [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else column.type.python_type(value)
+            for column, value in zip(columns, values)
+        ]
+    except (binascii.Error, ValueError, TypeError, KeyError, NotImplementedError):
+        return None, False
+    return key, bool(payload.get('b'))
+
+
+def keyset_page(query, order_by, cursor=None, per_page=10, descending=False, total=None):
+    """Return the KeysetPage of query that the cursor points at.
+
+    order_by lists the mapped columns the listing is sorted on; all of them
+    run in the same direction (descending or not).
+    """
+    key, backwards = decode_cursor(cursor, order_by)
+    # Going back means scanning the other way from the key, then flipping the rows
+    scan_descending = descending != backwards
+
+    if key is not None:
+        sort_key = tuple_(*order_by) if len(order_by) > 1 else order_by[0]
+        bound = tuple(key) if len(order_by) > 1 else key[0]
+        query = query.filter(sort_key < bound if scan_descending else sort_key > bound)
+    query = query.order_by(*[column.desc() if scan_descending else column.asc() for column in order_by])
+
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage(rows, total=total)
+
+    def key_of(row):
+        return [getattr(row, column.key) for column in order_by]
+
+    if backwards:
+        next_cursor = encode_cursor(key_of(rows[-1]))
+        prev_cursor = encode_cursor(key_of(rows[0]), backwards=True) if more else None
+    else:
+        next_cursor = encode_cursor(key_of(rows[-1])) if more else None
+        prev_cursor = encode_cursor(key_of(rows[0]), backwards=True) if key is not None else None
+    return KeysetPage(rows, next_cursor, prev_cursor, total)
@@ -0,0 +1,168 @@
+"""
+Password hashing off the request thread, with a login throttle.
+
+bcrypt is deliberately slow: at the default work factor one check costs a
+CPU core a few hundred milliseconds. When a whole shift logs in at once,
+unbounded hashing pins every core and POS requests queue behind it.
+
+PasswordHasher runs every bcrypt call in a small per-process thread pool
+(bcrypt releases the GIL, so threaded workers keep serving other requests
+while a hash runs). At most PASSWORD_HASH_WORKERS hashes run and
+PASSWORD_HASH_QUEUE wait per process; beyond that HashingBusy is raised
+straight away, rather than a login holding its worker for a long time.
+
+The work factor is BCRYPT_LOG_ROUNDS. Hashes made with a different cost
+are rehashed on the user's next successful login.
+
+LoginThrottle counts failed logins per (client address, email) and refuses
+further attempts, before any hashing, once LOGIN_MAX_FAILURES failures
+fall within LOGIN_FAILURE_WINDOW seconds. The client address is
+request.remote_addr; behind a reverse proxy set PROXY_FIX_X_FOR to the
+number of proxies so it is read from X-Forwarded-For, otherwise every
+client shares the proxy's address (and one client's failures lock out
+everyone trying the same email).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+from app import bcrypt
+
+# Forget expired failures of every client once this many are tracked
+MAX_TRACKED_LOGINS = 10000
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing pool of this process is full"""
+
+
+def cost_of(password_hash):
+    """Return the bcrypt work factor a hash was made with ($2b$<cost>$...)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Flask extension running bcrypt in a bounded thread pool"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BCRYPT_LOG_ROUNDS', 12)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_QUEUE', 8)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)  # seconds
+        app.extensions['password_hasher'] = self
+
+    def _pool(self):
+        # Created on first use in each process: threads do not survive a gunicorn fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    workers = current_app.config['PASSWORD_HASH_WORKERS']
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+                    self._slots = threading.BoundedSemaphore(workers + current_app.config['PASSWORD_HASH_QUEUE'])
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        executor = self._pool()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is freed when the hash finishes, not when this request
+        # stops waiting for it, so timed-out hashes still count as running
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+        except FutureTimeoutError:
+            raise HashingBusy()
+
+    def hash(self, password):
+        """Hash a password at the configured BCRYPT_LOG_ROUNDS"""
+        rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+        return self._run(bcrypt.generate_password_hash, password, rounds).decode('utf-8')
+
+    def check(self, password_hash, password):
+        return self._run(bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return cost_of(password_hash) != current_app.config['BCRYPT_LOG_ROUNDS']
+
+
+class LoginThrottle:
+    """Failed-login counter per (client address, email), kept per process"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._failures = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOGIN_MAX_FAILURES', 5)
+        app.config.setdefault('LOGIN_FAILURE_WINDOW', 300)  # seconds
+        with self._lock:
+            self._failures.clear()
+        app.extensions['login_throttle'] = self
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        window = current_app.config['LOGIN_FAILURE_WINDOW']
+        while failures and failures[0] <= now - window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, address, email):
+        """Seconds until this client may try this email again (0 if it may now)"""
+        key = (address, email.lower())
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(key, now)
+            if failures is None or len(failures) < current_app.config['LOGIN_MAX_FAILURES']:
+                return 0
+            return int(failures[0] + current_app.config['LOGIN_FAILURE_WINDOW'] - now) + 1
+
+    def failed(self, address, email):
+        key = (address, email.lower())
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failures) >= MAX_TRACKED_LOGINS:
+                for tracked in list(self._failures):
+                    self._recent(tracked, now)
+            failures = self._recent(key, now)
+            if failures is None:
+                failures = self._failures[key] = deque()
+            failures.append(now)
+            # Never keep more than the limit; older failures no longer matter
+            while len(failures) > current_app.config['LOGIN_MAX_FAILURES']:
+                failures.popleft()
+
+    def succeeded(self, address, email):
+        with self._lock:
+            self._failures.pop((address, email.lower()), None)
+
+
+passwords = PasswordHasher()
+login_throttle = LoginThrottle()
@@ -0,0 +1,194 @@
+"""
+Bulk product import from supplier feeds.
+
+Streams a CSV or JSON Lines file in fixed-size chunks and upserts each
+chunk on product_code, so memory stays bounded whatever the file size.
+Expected fields: product_code, name, category, price and, optionally,
+stock_quantity, the units on hand. Units held by open carts are taken
+off that count, as stock is what is left for sale. A row that omits
+stock_quantity leaves an existing product's stock untouched (new products
+start at 0).
+
+Rows that fail validation are skipped and reported with their line number
+and reason.
+"""
+
+import csv
+import json
+import os
+from contextlib import nullcontext
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import func, select, update
+from app import db
+from app.catalog import catalog
+from app.database import upsert
+from app.events import log_products, COUNT, PRICE
+from app.models import Product, StockReservation
+from app.search import bulk_indexing
+from app.stats import stats_cache, PRODUCT_STATS
+from app.utils import to_money
+
+MIN_PRICE = Decimal('0.01')  # as the product forms require
+
+MAX_LENGTHS = {
+    'product_code': Product.product_code.type.length,
+    'name': Product.name.type.length,
+    'category': Product.category.type.length,
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.read = 0
+        self.upserted = 0
+        self.rejected = 0
+
+
+def _records(path, fmt):
+    """Yield (line_number, record) pairs from a CSV or JSONL file"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_number, {'_error': f'invalid JSON: {e}', '_raw': line.strip()}
+                    continue
+                yield line_number, record if isinstance(record, dict) else {'_error': 'not a JSON object', '_raw': line.strip()}
+
+
+def validate(record):
+    """Return (row, None) for a valid record or (None, reason)"""
+    if '_error' in record:
+        return None, record['_error']
+
+    row = {}
+    for field in ('product_code', 'name', 'category'):
+        value = str(record.get(field) or '').strip()
+        if not value:
+            return None, f'missing {field}'
+        if len(value) > MAX_LENGTHS[field]:
+            return None, f'{field} longer than {MAX_LENGTHS[field]} characters'
+        row[field] = value
+
+    try:
+        price = Decimal(str(record.get('price', '')).strip())
+    except InvalidOperation:
+        return None, f"invalid price {record.get('price')!r}"
+    if not price.is_finite() or to_money(price) < MIN_PRICE:
+        return None, f"invalid price {record.get('price')!r}"
+    row['price'] = to_money(price)
+
+    stock = record.get('stock_quantity')
+    if stock is not None and str(stock).strip() != '':
+        try:
+            row['stock_quantity'] = int(str(stock).strip())
+        except ValueError:
+            return None, f'invalid stock_quantity {stock!r}'
+        if row['stock_quantity'] < 0:
+            return None, f'invalid stock_quantity {stock!r}'
+    return row, None
+
+
+def _flush(chunk):
+    """Upsert one chunk; rows with and without stock_quantity update different columns"""
+    now = datetime.utcnow()
+    with_stock, without_stock = [], []
+    for row in chunk.values():
+        row['date_updated'] = now
+        if 'stock_quantity' in row:
+            with_stock.append({**row, 'date_created': now})
+        else:
+            without_stock.append({**row, 'stock_quantity': 0, 'date_created': now})
+
+    # Existing products whose price the rows without stock change (rows with
+    # stock log a count, which carries the price)
+    priced = {row['product_code']: row['price'] for row in without_stock}
+    repriced = [
+        code for code, price in db.session.query(Product.product_code, Product.price)
+        .filter(Product.product_code.in_(list(priced)))
+        if price != priced[code]
+    ]
+
+    columns = ['name', 'category', 'price', 'date_updated']
+    upsert(Product, with_stock, ('product_code',), columns + ['stock_quantity'])
+    upsert(Product, without_stock, ('product_code',), columns)
+    counted = [row['product_code'] for row in with_stock]
+    held = (
+        select(func.sum(StockReservation.quantity))
+        .where(StockReservation.product_id == Product.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(Product)
+        .where(Product.product_code.in_(counted), Product.id.in_(select(StockReservation.product_id)))
+        .values(stock_quantity=Product.stock_quantity - held)
+        .execution_options(synchronize_session=False)
+    )
+    # Log the new stock counts and changed prices; products created by this
+    # chunk (date_created is only written on insert) are counted at 0
+    log_products(COUNT, db.or_(
+        Product.product_code.in_(counted),
+        db.and_(Product.product_code.in_(list(priced)), Product.date_created == now)
+    ))
+    if repriced:
+        log_products(PRICE, Product.product_code.in_(repriced))
+    catalog.bump()
+    stats_cache.invalidate(PRODUCT_STATS)
+    db.session.commit()
+
+
+def import_products(path, fmt=None, chunk_size=5000, rejects_path=None, dry_run=False):
+    """Stream a product feed into the catalog. Returns an ImportResult.
+
+    Rejected rows are written to rejects_path as CSV (line, reason, record).
+    With dry_run the file is only validated. The search index is rebuilt
+    once at the end rather than row by row.
+    """
+    fmt = fmt or ('jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson') else 'csv')
+    result = ImportResult()
+    rejects_file = rejects = None
+    chunk = {}
+
+    try:
+        with nullcontext() if dry_run else bulk_indexing():
+            for line_number, record in _records(path, fmt):
+                result.read += 1
+                row, reason = validate(record)
+                if row is None:
+                    result.rejected += 1
+                    if rejects_path:
+                        if rejects is None:
+                            rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+                            rejects = csv.writer(rejects_file)
+                            rejects.writerow(['line', 'reason', 'record'])
+                        rejects.writerow([line_number, reason, record.get('_raw') or json.dumps(record)])
+                    continue
+
+                # A code repeated within a chunk keeps its last row, as a later chunk would
+                chunk[row['product_code']] = row
+                if len(chunk) >= chunk_size:
+                    if not dry_run:
+                        _flush(chunk)
+                    result.upserted += len(chunk)
+                    chunk = {}
+
+            if chunk:
+                if not dry_run:
+                    _flush(chunk)
+                result.upserted += len(chunk)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if rejects_file:
+            rejects_file.close()
+
+    return result
@@ -0,0 +1,237 @@
+"""
+Sales reporting backed by the daily_sales_rollup table.
+
+The rollup is kept current by the checkout engine (record_sale_rollup)
+and can be rebuilt from Transaction/Sale history with backfill_rollup.
+The per-cashier shift totals behind the staff dashboard work the same way
+(record_shift_totals / backfill_shift_totals).
+"""
+
+from datetime import datetime
+from sqlalchemy import Integer, Numeric, cast, delete, func, insert, literal, select, type_coerce
+from app import db
+from app.database import upsert_increment
+from app.models import Product, Transaction, Sale, DailySalesRollup, CashierShiftTotals
+from app.utils import VAT_RATE, to_money, vat_for
+
+
+def record_sale_rollup(transaction, products, cart):
+    """Add the lines of a just-flushed transaction onto the daily rollup"""
+    sale_date = transaction.date_created.date()
+    rows = {}
+    for item in cart:
+        product = products[item['product_id']]
+        key = (sale_date, transaction.cashier_id, product.category, product.id)
+        row = rows.setdefault(key, {
+            'sale_date': sale_date,
+            'cashier_id': transaction.cashier_id,
+            'category': product.category,
+            'product_id': product.id,
+            'quantity': 0,
+            'revenue': to_money(0),
+            'vat_amount': to_money(0)
+        })
+        line_total = to_money(item['unit_price']) * item['quantity']
+        row['quantity'] += item['quantity']
+        row['revenue'] += line_total
+        row['vat_amount'] += vat_for(line_total)
+
+    upsert_increment(
+        DailySalesRollup,
+        list(rows.values()),
+        key_columns=('sale_date', 'cashier_id', 'category', 'product_id'),
+        counter_columns=('quantity', 'revenue', 'vat_amount')
+    )
+
+
+def record_shift_totals(transaction, lines):
+    """Add a just-flushed transaction of `lines` sale lines onto its cashier's day"""
+    upsert_increment(
+        CashierShiftTotals,
+        [{
+            'cashier_id': transaction.cashier_id,
+            'shift_date': transaction.date_created.date(),
+            'transactions': 1,
+            'items': lines,
+            'grand_total': transaction.grand_total
+        }],
+        key_columns=('cashier_id', 'shift_date'),
+        counter_columns=('transactions', 'items', 'grand_total')
+    )
+
+
+def backfill_rollup(start_date=None, end_date=None):
+    """Rebuild rollup rows from Transaction/Sale history, optionally for a date range.
+
+    Returns the number of rollup rows written.
+    """
+    sale_date = func.date(Transaction.date_created)
+    # Work in raw integer cents; VAT is rounded per line like cart_totals()
+    line_cents = type_coerce(Sale.line_total, Integer)
+    line_vat_cents = cast(func.round(line_cents * literal(VAT_RATE, Numeric(4, 2))), Integer)
+
+    clear = delete(DailySalesRollup)
+    source = (
+        select(
+            sale_date,
+            Transaction.cashier_id,
+            Product.category,
+            Sale.product_id,
+            func.sum(Sale.quantity),
+            func.sum(line_cents),
+            func.sum(line_vat_cents)
+        )
+        .join(Sale, Sale.transaction_id == Transaction.id)
+        .join(Product, Product.id == Sale.product_id)
+        .group_by(sale_date, Transaction.cashier_id, Product.category, Sale.product_id)
+    )
+    if start_date:
+        clear = clear.where(DailySalesRollup.sale_date >= start_date)
+        source = source.where(Transaction.date_created >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        clear = clear.where(DailySalesRollup.sale_date <= end_date)
+        source = source.where(Transaction.date_created <= datetime.combine(end_date, datetime.max.time()))
+
+    db.session.execute(clear)
+    result = db.session.execute(
+        insert(DailySalesRollup).from_select(
+            ['sale_date', 'cashier_id', 'category', 'product_id', 'quantity', 'revenue', 'vat_amount'],
+            source
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def backfill_shift_totals(start_date=None, end_date=None):
+    """Rebuild the per-cashier shift totals from Transaction/Sale history.
+
+    Returns the number of rows written.
+    """
+    shift_date = func.date(Transaction.date_created)
+    lines = (
+        select(Sale.transaction_id, func.count().label('lines'))
+        .group_by(Sale.transaction_id)
+        .subquery()
+    )
+
+    clear = delete(CashierShiftTotals)
+    source = (
+        select(
+            Transaction.cashier_id,
+            shift_date,
+            func.count(Transaction.id),
+            func.coalesce(func.sum(lines.c.lines), 0),
+            func.sum(type_coerce(Transaction.grand_total, Integer))
+        )
+        .outerjoin(lines, lines.c.transaction_id == Transaction.id)
+        .group_by(Transaction.cashier_id, shift_date)
+    )
+    if start_date:
+        clear = clear.where(CashierShiftTotals.shift_date >= start_date)
+        source = source.where(Transaction.date_created >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        clear = clear.where(CashierShiftTotals.shift_date <= end_date)
+        source = source.where(Transaction.date_created <= datetime.combine(end_date, datetime.max.time()))
+
+    db.session.execute(clear)
+    result = db.session.execute(
+        insert(CashierShiftTotals).from_select(
+            ['cashier_id', 'shift_date', 'transactions', 'items', 'grand_total'],
+            source
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def transaction_count(start_date, end_date, cashier_id=None):
+    """Number of transactions in a date range, from the cashier shift totals"""
+    query = db.session.query(func.coalesce(func.sum(CashierShiftTotals.transactions), 0)).filter(
+        CashierShiftTotals.shift_date >= start_date,
+        CashierShiftTotals.shift_date <= end_date
+    )
+    if cashier_id:
+        query = query.filter(CashierShiftTotals.cashier_id == cashier_id)
+    return query.scalar()
+
+
+def rollup_query(columns, start_date, end_date, cashier_id=None, category=None):
+    """Build a SELECT over the rollup restricted to the report filters"""
+    query = db.session.query(*columns).filter(
+        DailySalesRollup.sale_date >= start_date,
+        DailySalesRollup.sale_date <= end_date
+    )
+    if cashier_id:
+        query = query.filter(DailySalesRollup.cashier_id == cashier_id)
+    if category:
+        query = query.filter(DailySalesRollup.category == category)
+    return query
+
+
+def sales_report(start_date, end_date, cashier_id=None, category=None, top_n=10):
+    """Build the summary cards and all three chart series from one rollup query.
+
+    Returns a dict with 'summary', 'daily', 'category' and 'products' keys,
+    each chart holding 'labels', 'data' and 'title' as sales_reports_data
+    has always returned them.
+    """
+    rows = rollup_query(
+        [
+            DailySalesRollup.sale_date,
+            DailySalesRollup.category,
+            DailySalesRollup.product_id,
+            Product.name,
+            func.sum(DailySalesRollup.quantity),
+            func.sum(DailySalesRollup.revenue),
+            func.sum(DailySalesRollup.vat_amount)
+        ],
+        start_date, end_date, cashier_id, category
+    ).join(Product, Product.id == DailySalesRollup.product_id).group_by(
+        DailySalesRollup.sale_date,
+        DailySalesRollup.category,
+        DailySalesRollup.product_id,
+        Product.name
+    ).order_by(DailySalesRollup.sale_date).all()
+
+    daily_data = {}
+    category_data = {}
+    product_data = {}
+    total_revenue = total_vat = to_money(0)
+    total_items = 0
+
+    for sale_date, cat, product_id, name, quantity, revenue, vat in rows:
+        date_key = sale_date.isoformat()
+        daily_data[date_key] = daily_data.get(date_key, 0) + revenue + vat
+        category_data[cat] = category_data.get(cat, 0) + revenue
+        if product_id not in product_data:
+            product_data[product_id] = [name, 0]
+        product_data[product_id][1] += quantity
+        total_revenue += revenue + vat
+        total_vat += vat
+        total_items += quantity
+
+    top = sorted(product_data.values(), key=lambda p: p[1], reverse=True)[:top_n]
+
+    return {
+        'summary': {
+            'total_revenue': total_revenue,
+            'total_vat': total_vat,
+            'total_items': total_items
+        },
+        'daily': {
+            'labels': list(daily_data.keys()),
+            'data': [float(total) for total in daily_data.values()],
+            'title': 'Daily Sales'
+        },
+        'category': {
+            'labels': list(category_data.keys()),
+            'data': [float(total) for total in category_data.values()],
+            'title': 'Sales by Category'
+        },
+        'products': {
+            'labels': [name for name, _ in top],
+            'data': [quantity for _, quantity in top],
+            'title': f'Top {top_n} Products by Quantity'
+        }
+    }
@@ -0,0 +1,214 @@
+"""
+Stock reservations for open carts.
+
+Adding a line to a cart reserves its units with a conditional decrement
+(UPDATE product SET stock_quantity = stock_quantity - n WHERE id = ? AND
+stock_quantity >= n). That statement only touches the one product row, so
+tills selling different products never wait on each other, and two tills
+after the last units of the same product cannot both get them. Checkout
+(app.checkout.complete_sale) converts the cart's reservations into sales;
+reservations left behind by abandoned carts expire after RESERVATION_TTL
+seconds and the sweeper puts their units back on sale (and drops the
+abandoned carts themselves).
+
+Every write to a cart's reservations first pushes out the expiry of all of
+them, which also stops the sweeper from releasing a hold that is being
+used at the same moment.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete
+from app import db, carts
+from app.models import Product, StockReservation
+
+
+class InsufficientStockError(Exception):
+    """Raised when a cart line asks for more units than are in stock"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        names = ', '.join(f"{name} (available: {available})" for name, available in shortages)
+        super().__init__(f'Insufficient stock for: {names}')
+
+
+def expiry():
+    return datetime.utcnow() + timedelta(seconds=current_app.config.get('RESERVATION_TTL', 900))
+
+
+def touch(cart_id):
+    """Extend every reservation of a cart; returns {product_id: reserved quantity}"""
+    db.session.execute(
+        update(StockReservation)
+        .where(StockReservation.cart_id == cart_id)
+        .values(expires_at=expiry())
+        .execution_options(synchronize_session=False)
+    )
+    return held(cart_id)
+
+
+def held(cart_id):
+    """Return {product_id: reserved quantity} for a cart"""
+    rows = db.session.execute(
+        select(StockReservation.product_id, StockReservation.quantity)
+        .where(StockReservation.cart_id == cart_id)
+    )
+    return dict(rows.all())
+
+
+def adjust_stock(product_id, delta, oversell=False):
+    """Take delta more units of a product (or give -delta back).
+
+    Taking stock is conditional on enough being available; returns False
+    when it is not. With oversell the units are taken regardless and stock
+    may go negative (for sales that have already happened).
+    """
+    if delta == 0:
+        return True
+    query = update(Product).where(Product.id == product_id)
+    if delta > 0 and not oversell:
+        query = query.where(Product.stock_quantity >= delta)
+    result = db.session.execute(
+        query.values(stock_quantity=Product.stock_quantity - delta)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def reserve(cart_id, product, quantity):
+    """Hold exactly quantity units of product for the cart.
+
+    Raises InsufficientStockError (with the units this cart could have)
+    if the product does not have enough stock left.
+    """
+    try:
+        reserved = touch(cart_id).get(product.id, 0)
+        if not adjust_stock(product.id, quantity - reserved):
+            available = db.session.query(Product.stock_quantity).filter_by(id=product.id).scalar() or 0
+            raise InsufficientStockError([(product.name, available + reserved)])
+
+        if reserved:
+            db.session.execute(
+                update(StockReservation)
+                .where(StockReservation.cart_id == cart_id, StockReservation.product_id == product.id)
+                .values(quantity=quantity)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            db.session.add(StockReservation(cart_id=cart_id, product_id=product.id,
+                                            quantity=quantity, expires_at=expiry()))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _give_back(reservations, *conditions):
+    """Delete reservations (id, product_id, quantity) and return their units.
+
+    A reservation already gone, or no longer matching conditions, is
+    skipped, so two releases racing for the same hold return it once.
+    Returns the number released.
+    """
+    released = 0
+    for reservation_id, product_id, quantity in reservations:
+        result = db.session.execute(
+            delete(StockReservation)
+            .where(StockReservation.id == reservation_id, *conditions)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            adjust_stock(product_id, -quantity)
+            released += 1
+    return released
+
+
+def release(cart_id, product_id=None):
+    """Give back a cart's reservation for one product, or all of them"""
+    query = select(StockReservation.id, StockReservation.product_id, StockReservation.quantity) \
+        .where(StockReservation.cart_id == cart_id)
+    if product_id is not None:
+        query = query.where(StockReservation.product_id == product_id)
+    try:
+        _give_back(db.session.execute(query).all())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def sweep_expired(batch_size=500):
+    """Release every expired reservation; returns how many were released"""
+    released = 0
+    while True:
+        now = datetime.utcnow()
+        expired = db.session.execute(
+            select(StockReservation.id, StockReservation.product_id, StockReservation.quantity)
+            .where(StockReservation.expires_at < now)
+            .order_by(StockReservation.expires_at)
+            .limit(batch_size)
+        ).all()
+        if not expired:
+            break
+
+        try:
+            # Re-check the expiry: the cart may have been touched since the SELECT
+            batch_released = _give_back(expired, StockReservation.expires_at < now)
+            db.session.commit()
+            released += batch_released
+        except Exception:
+            db.session.rollback()
+            raise
+        if len(expired) < batch_size:
+            break
+    return released
+
+
+class ReservationSweeper:
+    """Flask extension running sweep_expired every RESERVATION_SWEEP_INTERVAL seconds.
+
+    The thread starts with the first request a worker serves (not at import
+    or in CLI commands). Every worker runs one; the conditional deletes keep
+    them from releasing the same reservation twice.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESERVATION_TTL', 900)
+        interval = app.config.setdefault('RESERVATION_SWEEP_INTERVAL', 60)
+        if interval > 0:
+            app.before_request(lambda: self.start(app))
+        app.extensions['reservation_sweeper'] = self
+
+    def start(self, app):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(app,), name='reservation-sweeper',
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self, app):
+        while True:
+            time.sleep(app.config['RESERVATION_SWEEP_INTERVAL'])
+            with app.app_context():
+                try:
+                    released = sweep_expired()
+                    if released:
+                        app.logger.info('Released %d expired stock reservation(s)', released)
+                    carts.purge(app.config['RESERVATION_TTL'])
+                except Exception:
+                    app.logger.exception('Stock reservation sweep failed')
+                finally:
+                    db.session.remove()
+
+
+sweeper = ReservationSweeper()
@@ -0,0 +1,197 @@
+"""
+Product search for the POS screen.
+
+SQLite:     an FTS5 index (product_search) over name and product_code with
+            prefix indexes, kept in sync with the product table by triggers.
+            Candidates come from bounded windows (FTS matches, names
+            starting with the query, and code prefix hits through the
+            product_code index) and are ordered by exact code, code/name
+            prefix, then shortest name, so a one-letter typeahead query
+            never scores the whole catalog.
+PostgreSQL: pg_trgm GIN indexes on name and product_code, ranked by
+            similarity().
+Others:     plain prefix LIKE on the indexed columns.
+
+The index objects are created with the product table (db.create_all) and
+by migration for existing databases.
+"""
+
+import re
+from contextlib import contextmanager
+from sqlalchemy import DDL, event, select, text
+from app import db
+from app.models import Product
+
+# Upper bound on FTS matches considered for ranking
+CANDIDATE_WINDOW = 500
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        name, product_code, content='product', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_ai AFTER INSERT ON product BEGIN
+        INSERT INTO product_search (rowid, name, product_code) VALUES (new.id, new.name, new.product_code);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_ad AFTER DELETE ON product BEGIN
+        INSERT INTO product_search (product_search, rowid, name, product_code)
+        VALUES ('delete', old.id, old.name, old.product_code);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_au AFTER UPDATE OF name, product_code ON product BEGIN
+        INSERT INTO product_search (product_search, rowid, name, product_code)
+        VALUES ('delete', old.id, old.name, old.product_code);
+        INSERT INTO product_search (rowid, name, product_code) VALUES (new.id, new.name, new.product_code);
+    END
+    """,
+]
+
+SQLITE_TRIGGERS = ('product_search_ai', 'product_search_ad', 'product_search_au')
+
+POSTGRESQL_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ix_product_name_trgm ON product USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_product_code_trgm ON product USING gin (product_code gin_trgm_ops)',
+]
+
+for statement in SQLITE_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRESQL_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _search_sqlite(query, limit):
+    terms = _terms(query)
+    if not terms:
+        return []
+    # Every term must match as a prefix of a word in the name or product code
+    match = ' '.join(f'"{term}"*' for term in terms)
+    # The name starts with the query
+    name_prefix = 'name : ^"{}"*'.format(' '.join(terms))
+    # Candidates, each read in rowid order (never scored): half the window
+    # of any FTS matches, half of names starting with the query, and the
+    # codes starting with it (as typed or in capitals) through the unique
+    # product_code index, so the best hits of a broad query are never
+    # crowded out by arbitrary matches
+    statement = text(
+        """
+        SELECT product.* FROM (
+            SELECT * FROM (SELECT rowid AS id FROM product_search WHERE product_search MATCH :match LIMIT :window)
+            UNION
+            SELECT * FROM (SELECT rowid AS id FROM product_search WHERE product_search MATCH :name_prefix LIMIT :window)
+            UNION
+            SELECT * FROM (SELECT id FROM product WHERE product_code >= :code AND product_code < :code_end LIMIT :limit)
+            UNION
+            SELECT * FROM (SELECT id FROM product WHERE product_code >= :upper AND product_code < :upper_end LIMIT :limit)
+        ) AS candidate
+        JOIN product ON product.id = candidate.id
+        ORDER BY lower(product.product_code) = :query DESC,
+                 lower(product.product_code) LIKE :prefix DESC,
+                 lower(product.name) LIKE :prefix DESC,
+                 length(product.name),
+                 product.name
+        LIMIT :limit
+        """
+    ).bindparams(
+        match=match, name_prefix=name_prefix, window=max(limit, CANDIDATE_WINDOW // 2),
+        code=query, code_end=query + '\U0010ffff', upper=query.upper(), upper_end=query.upper() + '\U0010ffff',
+        query=query.lower(), prefix=f'{query.lower()}%', limit=limit
+    )
+    return db.session.scalars(select(Product).from_statement(statement)).all()
+
+
+def _search_postgresql(query, limit):
+    pattern = f'%{query}%'
+    statement = text(
+        """
+        SELECT product.* FROM product
+        WHERE name ILIKE :pattern OR product_code ILIKE :pattern
+        ORDER BY GREATEST(similarity(name, :query), similarity(product_code, :query)) DESC
+        LIMIT :limit
+        """
+    ).bindparams(pattern=pattern, query=query, limit=limit)
+    return db.session.scalars(select(Product).from_statement(statement)).all()
+
+
+def _search_prefix(query, limit):
+    pattern = f'{query}%'
+    return Product.query.filter(
+        Product.name.ilike(pattern) | Product.product_code.ilike(pattern)
+    ).order_by(Product.name).limit(limit).all()
+
+
+def search_products(query, limit=20):
+    """Return up to `limit` products matching the query, best match first"""
+    query = query.strip()
+    if not query:
+        return []
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return _search_sqlite(query, limit)
+    if dialect == 'postgresql':
+        return _search_postgresql(query, limit)
+    return _search_prefix(query, limit)
+
+
+def rebuild_search_index():
+    """Create the search index objects if missing and re-index every product"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            db.session.execute(text(statement))
+        db.session.execute(text("INSERT INTO product_search (product_search) VALUES ('rebuild')"))
+    elif dialect == 'postgresql':
+        for statement in POSTGRESQL_DDL:
+            db.session.execute(text(statement))
+    db.session.commit()
+
+
+def restore_search_triggers():
+    """Re-create the search triggers, and re-index, if a bulk load left them dropped.
+
+    Returns True when the index had to be rebuilt.
+    """
+    if db.session.get_bind().dialect.name != 'sqlite':
+        return False
+    present = set(db.session.scalars(text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")))
+    if 'product_search' not in present or present.issuperset(SQLITE_TRIGGERS):
+        return False
+    rebuild_search_index()
+    return True
+
+
+@contextmanager
+def bulk_indexing():
+    """Suspend per-row search index upkeep for a bulk product load, then rebuild once.
+
+    FTS5 triggers cost far more per row than the product write itself; for
+    large imports dropping them and rebuilding the index at the end is an
+    order of magnitude faster. Searches may miss products until the load
+    finishes. If the process is killed before then, the triggers are put
+    back by restore_search_triggers() when the app next starts, or by
+    `flask products reindex`.
+    """
+    if db.session.get_bind().dialect.name != 'sqlite':
+        yield
+        return
+
+    for trigger in SQLITE_TRIGGERS:
+        db.session.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+    db.session.commit()
+    try:
+        yield
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        rebuild_search_index()
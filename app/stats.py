@@ -0,0 +1,118 @@
+"""
+Short-lived cache for the admin dashboard counters.
+
+The admin dashboard, user management and product management pages poll
+user and product counts. Each set is computed by one conditional-aggregate
+query and kept per process for STATS_CACHE_TTL seconds.
+
+The user and product admin routes invalidate the set they change by
+bumping its version stamp in the cache_version table, in the same
+database transaction as the change; every worker compares the stamp
+(a primary-key lookup) before serving a cached set, so admin changes show
+up in all workers at once. Stock moved by checkouts and cart reservations
+bumps nothing and is picked up when the entry expires, so low-stock
+counts and the stock value may lag by up to STATS_CACHE_TTL seconds.
+STATS_CACHE_TTL = 0 turns the cache off.
+"""
+
+import threading
+import time
+from sqlalchemy import case, func, type_coerce
+from app import db
+from app.database import Money, upsert_increment
+from app.models import User, Product, CacheVersion
+
+USER_STATS = 'users'
+PRODUCT_STATS = 'products'
+
+
+class StatsCache:
+    """Flask extension holding computed stats by key until they expire"""
+
+    def __init__(self, app=None):
+        self.ttl = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.setdefault('STATS_CACHE_TTL', 10)
+        self.clear()
+        app.extensions['stats_cache'] = self
+
+    @staticmethod
+    def _stored_version(key):
+        version = db.session.query(CacheVersion.version).filter_by(name=f'stats:{key}').scalar()
+        return version or 0
+
+    def get(self, key, load):
+        """Return the cached value for key, calling load() when it is missing, stale or invalidated"""
+        if self.ttl <= 0:
+            return load()
+        now = time.monotonic()
+        version = self._stored_version(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                return entry[2]
+
+        value = load()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, version, value)
+        return value
+
+    def invalidate(self, *keys):
+        """Invalidate keys in every worker; call before committing the change"""
+        upsert_increment(
+            CacheVersion,
+            [{'name': f'stats:{key}', 'version': 1} for key in keys],
+            key_columns=('name',),
+            counter_columns=('version',)
+        )
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+stats_cache = StatsCache()
+
+
+def _count_where(condition):
+    return func.count(case((condition, 1)))
+
+
+def _load_user_stats():
+    total, admins, cashiers = db.session.query(
+        func.count(User.id),
+        _count_where(User.role == 'admin'),
+        _count_where(User.role == 'staff')
+    ).one()
+    return {'total_users': total, 'total_admins': admins, 'total_cashiers': cashiers}
+
+
+def _load_product_stats():
+    total, low_stock, stock_value = db.session.query(
+        func.count(Product.id),
+        _count_where(Product.stock_quantity < 10),
+        type_coerce(func.sum(Product.price * Product.stock_quantity), Money)
+    ).one()
+    return {
+        'total_products': total,
+        'low_stock_products': low_stock,
+        'total_stock_value': round(float(stock_value or 0), 2)
+    }
+
+
+def user_counts():
+    """User counts in total and by role"""
+    return stats_cache.get(USER_STATS, _load_user_stats)
+
+
+def product_counts():
+    """Product count, low-stock count and stock value at selling price"""
+    return stats_cache.get(PRODUCT_STATS, _load_product_stats)
@@ -0,0 +1,151 @@
+"""
+Sync of sales queued by offline tills.
+
+A till in offline mode (see offline_till.py) sells from its own snapshot
+of the catalog and queues each completed sale locally. Once it can reach
+the server it posts the queue in batches to /api/till/sync:
+
+    {"sales": [{"client_ref": "9f1c...", "sold_at": "2026-03-01T10:15:02",
+                "payment_method": "cash",
+                "lines": [{"product_id": 7, "quantity": 2, "unit_price": "10.50"}]}]}
+
+client_ref is generated on the till and stored on the Transaction with a
+unique index, so a batch sent twice (e.g. after the response was lost)
+records each sale once. Each sale goes through complete_sale in its own
+database transaction, at the till's prices and time of sale, so one bad
+sale does not hold up the rest of the batch.
+
+The goods have already left the store, so sales are recorded even when
+they take stock below zero (oversell); only sales that cannot be recorded
+at all, e.g. malformed or for a product that no longer exists, are
+rejected.
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Transaction
+from app.checkout import complete_sale
+from app.reservations import InsufficientStockError
+from app.utils import to_money
+
+PAYMENT_METHODS = ('cash', 'card')
+CLOCK_SKEW = timedelta(minutes=5)  # how far ahead of the server a till's clock may run
+
+CREATED = 'created'
+DUPLICATE = 'duplicate'
+REJECTED = 'rejected'
+
+
+class InvalidSale(ValueError):
+    """A queued sale that cannot be recorded as sent"""
+
+
+def _positive_int(value, name):
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise InvalidSale(f'{name} must be a positive integer')
+    return value
+
+
+def _parse_time(value):
+    """Naive UTC datetime from an ISO 8601 string"""
+    try:
+        sold_at = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidSale('sold_at must be an ISO 8601 date and time')
+    if sold_at.tzinfo is not None:
+        sold_at = sold_at.astimezone(timezone.utc).replace(tzinfo=None)
+    if sold_at > datetime.utcnow() + CLOCK_SKEW:
+        raise InvalidSale('sold_at is in the future')
+    return sold_at
+
+
+def parse_sale(payload):
+    """Return (cart, payment_method, sold_at) for one queued sale, or raise InvalidSale"""
+    if payload.get('payment_method') not in PAYMENT_METHODS:
+        raise InvalidSale('payment_method must be cash or card')
+    sold_at = _parse_time(payload.get('sold_at'))
+
+    lines = payload.get('lines')
+    if not isinstance(lines, list) or not lines:
+        raise InvalidSale('a sale needs at least one line')
+    cart = []
+    for line in lines:
+        if not isinstance(line, dict):
+            raise InvalidSale('each line must be an object')
+        try:
+            unit_price = to_money(Decimal(str(line.get('unit_price'))))
+        except InvalidOperation:
+            raise InvalidSale('unit_price must be a non-negative number')
+        if not unit_price.is_finite() or unit_price < 0:
+            raise InvalidSale('unit_price must be a non-negative number')
+        cart.append({
+            'product_id': _positive_int(line.get('product_id'), 'product_id'),
+            'quantity': _positive_int(line.get('quantity'), 'quantity'),
+            'unit_price': unit_price
+        })
+    return cart, payload['payment_method'], sold_at
+
+
+def _client_ref(payload):
+    client_ref = payload.get('client_ref') if isinstance(payload, dict) else None
+    if not isinstance(client_ref, str) or not 0 < len(client_ref) <= 64:
+        return None
+    return client_ref
+
+
+def sync_sales(cashier_id, payloads):
+    """Record a batch of queued sales for a cashier.
+
+    Returns one result per payload, in order: {'client_ref', 'status'} plus
+    'transaction_id' for created and duplicate sales or 'error' for rejected
+    ones.
+    """
+    refs = [ref for ref in map(_client_ref, payloads) if ref is not None]
+    # One lookup for the sales the server already has
+    recorded = dict(
+        db.session.query(Transaction.client_ref, Transaction.id)
+        .filter(Transaction.client_ref.in_(refs)).all()
+    ) if refs else {}
+
+    results = []
+    for payload in payloads:
+        client_ref = _client_ref(payload)
+        if client_ref is None:
+            results.append({'client_ref': None, 'status': REJECTED,
+                            'error': 'client_ref must be a string of 1 to 64 characters'})
+            continue
+        if client_ref in recorded:
+            results.append({'client_ref': client_ref, 'status': DUPLICATE,
+                            'transaction_id': recorded[client_ref]})
+            continue
+
+        try:
+            cart, payment_method, sold_at = parse_sale(payload)
+            transaction = complete_sale(cashier_id, cart, payment_method,
+                                        client_ref=client_ref, sold_at=sold_at, oversell=True)
+        except InvalidSale as e:
+            results.append({'client_ref': client_ref, 'status': REJECTED, 'error': str(e)})
+            continue
+        except InsufficientStockError as e:
+            # With oversell the only shortages are products that no longer exist
+            names = ', '.join(name for name, _ in e.shortages)
+            results.append({'client_ref': client_ref, 'status': REJECTED, 'error': f'Unknown product: {names}'})
+            continue
+        except IntegrityError:
+            # Another request recorded the same sale since the lookup above
+            transaction_id = db.session.query(Transaction.id).filter_by(client_ref=client_ref).scalar()
+            if transaction_id is None:
+                raise
+            recorded[client_ref] = transaction_id
+            results.append({'client_ref': client_ref, 'status': DUPLICATE, 'transaction_id': transaction_id})
+            continue
+
+        # Read the id off the identity key: transaction.id would reload the
+        # committed (expired) row and its lines
+        transaction_id = inspect(transaction).identity[0]
+        recorded[client_ref] = transaction_id
+        results.append({'client_ref': client_ref, 'status': CREATED, 'transaction_id': transaction_id})
+    return results
@@ -0,0 +1,90 @@
+"""
+Process-local cache for the Flask-Login user loader.
+
+Every authenticated request resolves current_user, and every route then
+checks current_user.role, so without a cache each POS click costs a user
+SELECT. The cache keeps a detached, read-only snapshot of each recently
+seen user (no password hash) in an LRU dict for USER_CACHE_TTL seconds.
+
+edit_user and delete_user invalidate the entry in the worker that served
+them only. Other workers keep serving their snapshot until it expires, so
+after a role change or deletion a user keeps their old access in those
+workers for up to USER_CACHE_TTL seconds (default 5). A shared version
+stamp would not help here: checking it costs the same one-row SELECT the
+cache saves. Keep the TTL short, or set it to 0 to turn the cache off
+where revoking access must take effect at once.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from app import db
+from app.models import User
+
+
+class CachedUser(UserMixin):
+    """Read-only snapshot of a User row, safe to share between requests"""
+    __slots__ = ('id', 'name', 'email', 'role', 'date_created')
+
+    def __init__(self, user):
+        self.id = user.id
+        self.name = user.name
+        self.email = user.email
+        self.role = user.role
+        self.date_created = user.date_created
+
+    def __repr__(self):
+        return f"<User {self.email}>"
+
+
+class UserCache:
+    """Flask extension caching user_loader lookups with TTL and LRU eviction"""
+
+    def __init__(self, app=None):
+        self.ttl = 0
+        self.max_users = 0
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.setdefault('USER_CACHE_TTL', 5)
+        self.max_users = app.config.setdefault('USER_CACHE_MAX_USERS', 1000)
+        self.clear()
+        app.extensions['user_cache'] = self
+
+    def get(self, user_id):
+        """Return the user with this id (a CachedUser), or None if there is none"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._users.move_to_end(user_id)
+                return entry[1]
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+
+        cached = CachedUser(user)
+        if self.ttl > 0:
+            with self._lock:
+                self._users[user_id] = (now + self.ttl, cached)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
@@ -0,0 +1,33 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+VAT_RATE = Decimal('0.15')  # 15% VAT
+_VAT_RATIO = VAT_RATE.as_integer_ratio()
+CENT = Decimal('0.01')
+
+
+def to_money(value):
+    """Convert a number or numeric string to a Decimal rand amount rounded to the cent"""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def to_cents(value):
+    """Convert a rand amount to integer cents"""
+    return int(to_money(value) * 100)
+
+
+def from_cents(cents):
+    """Convert integer cents to a Decimal rand amount"""
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+
+def vat_for(amount):
+    """VAT due on a VAT-exclusive amount, rounded half up to the cent"""
+    return to_money(to_money(amount) * VAT_RATE)
+
+
+def vat_cents(cents):
+    """vat_for() in integer cents, for sums that stay in cents"""
+    numerator, denominator = _VAT_RATIO
+    return (2 * cents * numerator + denominator) // (2 * denominator)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Checkout benchmark
+Compares the legacy per-item checkout loop with the set-based checkout
+engine in app/checkout.py across growing basket sizes.
+
+Usage:
+    python benchmarks/bench_checkout.py [--runs 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_checkout.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from app import create_app, db
+from app.models import User, Product, Transaction, Sale
+from app.checkout import complete_sale, cart_totals
+
+BASKET_SIZES = [1, 5, 10, 30, 60, 120]
+
+
+def legacy_checkout(cashier_id, cart, payment_method):
+    """The original checkout() body: one Product.query.get per cart line"""
+    subtotal, vat, grand_total = cart_totals(cart)
+    transaction = Transaction(
+        cashier_id=cashier_id,
+        subtotal=subtotal,
+        vat_amount=vat,
+        grand_total=grand_total,
+        payment_method=payment_method,
+        status='completed'
+    )
+    db.session.add(transaction)
+    db.session.flush()
+
+    for item in cart:
+        product = db.session.get(Product, item['product_id'])
+        sale = Sale(
+            transaction_id=transaction.id,
+            product_id=item['product_id'],
+            quantity=item['quantity'],
+            unit_price=item['unit_price'],
+            line_total=item['unit_price'] * item['quantity']
+        )
+        product.stock_quantity -= item['quantity']
+        db.session.add(sale)
+
+    db.session.commit()
+    return transaction
+
+
+def seed(max_basket):
+    cashier = User(name='Bench Cashier', email='bench@example.com', password_hash='x', role='staff')
+    db.session.add(cashier)
+    for i in range(max_basket):
+        db.session.add(Product(
+            product_code=f'BENCH-{i:04d}',
+            name=f'Bench Product {i}',
+            category='Bench',
+            price=10.0 + i,
+            stock_quantity=10_000_000
+        ))
+    db.session.commit()
+    return cashier.id
+
+
+def build_cart(size):
+    products = Product.query.order_by(Product.id).limit(size).all()
+    return [
+        {'product_id': p.id, 'unit_price': p.price, 'quantity': 1}
+        for p in products
+    ]
+
+
+def time_checkout(fn, cashier_id, cart, runs):
+    timings = []
+    for _ in range(runs):
+        db.session.expire_all()
+        start = time.perf_counter()
+        fn(cashier_id, cart, 'cash')
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20, help='checkouts per basket size')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        cashier_id = seed(max(BASKET_SIZES))
+
+        print(f"{'basket':>8} {'legacy ms':>12} {'set-based ms':>14} {'speedup':>9}")
+        for size in BASKET_SIZES:
+            cart = build_cart(size)
+            legacy = time_checkout(legacy_checkout, cashier_id, cart, args.runs)
+            engine = time_checkout(complete_sale, cashier_id, cart, args.runs)
+            print(f"{size:>8} {legacy:>12.2f} {engine:>14.2f} {legacy / engine:>8.1f}x")
+
+    os.remove(DB_FILE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Login throughput benchmark
+Simulates a shift change: a burst of cashiers log in at once while a
+logged-in cashier keeps using the POS. For each bcrypt work factor it
+reports the cost of one hash, login throughput and latency, logins turned
+away by the bounded hashing pool (503), and POS search latency during the
+burst.
+
+Hashes are stored at the first cost in --costs and every other cost is
+measured after the users logged in once, so those logins also exercise the
+transparent rehash.
+
+Usage:
+    python benchmarks/bench_login.py [--costs 8,10,12] [--cashiers 40] [--workers 2]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_login.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from app import create_app, db, bcrypt
+from app.models import User, Product
+
+PASSWORD = 'shift123'
+
+
+def seed(cashiers, rounds):
+    password_hash = bcrypt.generate_password_hash(PASSWORD, rounds).decode('utf-8')
+    db.session.add_all([
+        User(name=f'Cashier {i}', email=f'cashier{i}@example.com', password_hash=password_hash, role='staff')
+        for i in range(cashiers + 1)
+    ])
+    db.session.add_all([
+        Product(product_code=f'LG-{i:03d}', name=f'Login Product {i}', category='Bench', price=10, stock_quantity=100)
+        for i in range(200)
+    ])
+    db.session.commit()
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))] if samples else 0.0
+
+
+def login(client, email):
+    return client.post('/auth/login', data={'email': email, 'password': PASSWORD})
+
+
+def shift_change(app, cashiers):
+    """Log every cashier in at once; returns (latencies, statuses, pos latencies, seconds)"""
+    latencies, statuses, pos_latencies = [], [], []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    pos_client = app.test_client()
+    login(pos_client, 'cashier0@example.com')
+
+    def cashier(i):
+        client = app.test_client()
+        start = time.perf_counter()
+        status = login(client, f'cashier{i}@example.com').status_code
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            statuses.append(status)
+
+    def pos_user():
+        while not done.is_set():
+            start = time.perf_counter()
+            pos_client.get('/api/products/search?q=log&limit=10')
+            pos_latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=cashier, args=(i,)) for i in range(1, cashiers + 1)]
+    pos_thread = threading.Thread(target=pos_user)
+    start = time.perf_counter()
+    pos_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    done.set()
+    pos_thread.join()
+    return latencies, statuses, pos_latencies, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--costs', default='8,10,12', help='comma-separated bcrypt work factors')
+    parser.add_argument('--cashiers', type=int, default=40, help='cashiers logging in at once')
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS')
+    parser.add_argument('--queue', type=int, default=64, help='PASSWORD_HASH_QUEUE')
+    args = parser.parse_args()
+    costs = [int(cost) for cost in args.costs.split(',')]
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['PASSWORD_HASH_WORKERS'] = args.workers
+    app.config['PASSWORD_HASH_QUEUE'] = args.queue
+    with app.app_context():
+        db.create_all()
+        seed(args.cashiers, costs[0])
+
+    print(f"{args.cashiers} cashiers logging in at once, {args.workers} hashing thread(s), queue {args.queue}\n")
+    print(f"{'cost':>4} {'hash ms':>9} {'logins/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'503s':>5} {'POS p95 ms':>11}")
+    for cost in costs:
+        app.config['BCRYPT_LOG_ROUNDS'] = cost
+        start = time.perf_counter()
+        bcrypt.generate_password_hash(PASSWORD, cost)
+        hash_ms = (time.perf_counter() - start) * 1000
+
+        latencies, statuses, pos_latencies, seconds = shift_change(app, args.cashiers)
+        logged_in = statuses.count(302)
+        print(f"{cost:>4} {hash_ms:>9.1f} {logged_in / seconds:>9.1f} "
+              f"{percentile(latencies, 0.50) * 1000:>9.1f} {percentile(latencies, 0.95) * 1000:>9.1f} "
+              f"{statuses.count(503):>5} {percentile(pos_latencies, 0.95) * 1000:>11.1f}")
+
+    os.remove(DB_FILE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Product search benchmark
+Seeds a large catalog and compares the old POS search (ILIKE '%q%' over
+name and product_code) with search_products() from app/search.py, timing
+typeahead-sized queries (top 10) the way /api/products/search issues them.
+
+Usage:
+    python benchmarks/bench_search.py [--products 100000] [--runs 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import insert
+from app import create_app, db
+from app.models import Product
+from app.search import search_products
+
+WORDS = [
+    'apple', 'banana', 'bread', 'butter', 'cheese', 'chicken', 'chips', 'cola',
+    'coffee', 'cream', 'eggs', 'flour', 'juice', 'maize', 'milk', 'oats',
+    'oil', 'pasta', 'rice', 'salt', 'soap', 'sugar', 'tea', 'tomato',
+    'tuna', 'water', 'yoghurt', 'brown', 'white', 'large', 'small', 'family',
+]
+QUERIES = ['mi', 'mil', 'milk', 'brown br', 'sugar wh', 'co', 'cof', 'SKU-0123', 'tomato sm', 'yog']
+CHUNK_SIZE = 10_000
+
+
+def seed(count, rng):
+    rows = []
+    for i in range(count):
+        rows.append({
+            'product_code': f'SKU-{i:06d}',
+            'name': ' '.join(rng.sample(WORDS, 3)).title() + f' {rng.randint(100, 999)}g',
+            'category': rng.choice(WORDS).title(),
+            'price': rng.randint(100, 50_000) / 100,
+            'stock_quantity': rng.randint(0, 200),
+        })
+        if len(rows) >= CHUNK_SIZE:
+            db.session.execute(insert(Product), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Product), rows)
+    db.session.commit()
+
+
+def legacy_search(query, limit):
+    """The original pos() search: leading-wildcard ILIKE on both columns"""
+    return Product.query.filter(
+        (Product.name.ilike(f'%{query}%')) |
+        (Product.product_code.ilike(f'%{query}%'))
+    ).all()[:limit]
+
+
+def time_search(fn, query, runs):
+    timings = []
+    for _ in range(runs):
+        db.session.expire_all()
+        start = time.perf_counter()
+        fn(query, 10)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[int(len(timings) * 0.95) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100_000, help='catalog size')
+    parser.add_argument('--runs', type=int, default=50, help='searches per query')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        seed(args.products, random.Random(9))
+        print(f"Seeded {args.products:,} products in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'query':>12} {'ILIKE p50 ms':>14} {'index p50 ms':>14} {'index p95 ms':>14}")
+        worst_p95 = 0.0
+        for query in QUERIES:
+            legacy, _ = time_search(legacy_search, query, args.runs)
+            p50, p95 = time_search(search_products, query, args.runs)
+            worst_p95 = max(worst_p95, p95)
+            print(f"{query!r:>12} {legacy:>14.2f} {p50:>14.2f} {p95:>14.2f}")
+
+    os.remove(DB_FILE)
+    print(f"\n{'✅' if worst_p95 < 5 else '⚠️'} Worst typeahead p95: {worst_p95:.2f} ms (target 5 ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+WSGI server configuration benchmark
+Starts gunicorn with gunicorn.conf.py under several worker configurations
+and drives each one with benchmarks/load_test.py --url (cashiers selling
+through the POS while admins poll the reports). It then compares
+throughput and p95 latency of the POS and report routes.
+
+Every configuration runs against its own copy of the same seeded SQLite
+database (seed_products.py --size small unless --database is given).
+
+Usage:
+    python benchmarks/bench_wsgi.py [--cashiers 8] [--customers 15] [--configs old,sync,gthread]
+    python benchmarks/bench_wsgi.py --database /path/to/seeded.db
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.error import URLError
+from urllib.request import urlopen
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Environment overrides for gunicorn.conf.py, per configuration
+CONFIGS = {
+    'old': {  # the previous `gunicorn run:app`: one sync worker, no preload
+        'GUNICORN_WORKER_CLASS': 'sync', 'WEB_CONCURRENCY': '1', 'GUNICORN_PRELOAD': 'false',
+    },
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread'},
+    'gevent': {'GUNICORN_WORKER_CLASS': 'gevent'},
+}
+ROUTES = ['pos_search', 'product_search', 'add_to_cart', 'checkout', 'sales_reports', 'product_stats']
+
+
+def seed_database(path, size, cashiers):
+    subprocess.run([sys.executable, 'seed_products.py', '--size', size, '--cashiers', str(cashiers)], cwd=ROOT,
+                   check=True, stdout=subprocess.DEVNULL, env={**os.environ, 'DATABASE_URL': f'sqlite:///{path}'})
+
+
+def wait_until_up(url, seconds=60):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(url + '/auth/login', timeout=2):
+                return
+        except (URLError, OSError):
+            time.sleep(0.25)
+    raise RuntimeError(f'gunicorn did not come up on {url}')
+
+
+def run_config(name, database, args, workdir):
+    db_copy = os.path.join(workdir, f'{name}.db')
+    shutil.copyfile(database, db_copy)
+    env = {
+        **os.environ, **CONFIGS[name],
+        'DATABASE_URL': f'sqlite:///{db_copy}',
+        'PORT': str(args.port),
+        'GUNICORN_ACCESS_LOG': '',
+    }
+    url = f'http://127.0.0.1:{args.port}'
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(url)
+        output = os.path.join(workdir, f'{name}.json')
+        subprocess.run([sys.executable, 'benchmarks/load_test.py', '--url', url,
+                        '--cashiers', str(args.cashiers), '--customers', str(args.customers),
+                        '--admins', str(args.admins), '--output', output],
+                       cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', default='old,sync,gthread,gevent', help='comma-separated names from CONFIGS')
+    parser.add_argument('--database', help='SQLite file seeded with at least --cashiers cashiers, copied for each run')
+    parser.add_argument('--size', default='small', help='seed_products.py preset when --database is not given')
+    parser.add_argument('--cashiers', type=int, default=8, help='concurrent cashiers')
+    parser.add_argument('--admins', type=int, default=1, help='concurrent admins polling reports')
+    parser.add_argument('--customers', type=int, default=15, help='sales per cashier')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    database = args.database
+    if not database:
+        database = os.path.join(workdir, 'seed.db')
+        print(f'Seeding a {args.size} store...')
+        seed_database(database, args.size, args.cashiers)
+
+    results = {}
+    for name in args.configs.split(','):
+        if CONFIGS[name].get('GUNICORN_WORKER_CLASS') == 'gevent' and importlib.util.find_spec('gevent') is None:
+            print(f'Skipping {name}: gevent is not installed')
+            continue
+        print(f'Running {name}...')
+        results[name] = run_config(name, database, args, workdir)
+
+    print(f"\n{'config':<8} {'req/s':>7} {'errors':>6} " + ' '.join(f'{route[:13]:>13}' for route in ROUTES))
+    print(f"{'':<8} {'':>7} {'':>6} " + ' '.join(f"{'p95 ms':>13}" for _ in ROUTES))
+    for name, result in results.items():
+        totals, routes = result['totals'], result['routes']
+        p95s = ' '.join(f"{routes[route]['p95_ms'] if route in routes else float('nan'):>13.1f}" for route in ROUTES)
+        print(f"{name:<8} {totals['throughput_rps']:>7.1f} {totals['errors']:>6} {p95s}")
+
+    shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Query plan check
+Drives every dashboard, report and POS route through the Flask test client,
+captures each SELECT it issues and runs EXPLAIN QUERY PLAN on it.
+Exits non-zero if a filtered query falls back to a full table scan.
+
+Usage:
+    python benchmarks/explain_queries.py [--verbose]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'explain.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import event
+from app import create_app, db, bcrypt
+from app.models import User, Product
+
+ADMIN_ROUTES = [
+    '/admin_dashboard',
+    '/sales_reports',
+    '/sales_reports?category=Pantry',
+    '/sales_reports_data?chart_type=all',
+    '/manage_users',
+    '/user_stats',
+    '/manage_products',
+    '/product_stats',
+]
+
+STAFF_ROUTES = [
+    '/staff_dashboard',
+    '/pos',
+    '/api/products/search?q=expl',
+    '/sales_history',
+    '/receipt/1',
+]
+
+
+def seed():
+    password = bcrypt.generate_password_hash('explain123').decode('utf-8')
+    db.session.add(User(name='Admin', email='admin@example.com', password_hash=password, role='admin'))
+    db.session.add(User(name='Cashier', email='cashier@example.com', password_hash=password, role='staff'))
+    for i in range(20):
+        db.session.add(Product(
+            product_code=f'EXPL-{i:03d}',
+            name=f'Explain Product {i}',
+            category='Pantry' if i % 2 else 'Bakery',
+            price=9.99 + i,
+            stock_quantity=i
+        ))
+    db.session.commit()
+
+
+def login(app, email):
+    client = app.test_client()
+    client.post('/auth/login', data={'email': email, 'password': 'explain123'})
+    return client
+
+
+def capture_selects(app, client, routes):
+    """Return [(route, sql, params)] for every SELECT issued by the routes"""
+    captured = []
+    current = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((current['route'], statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for route in routes:
+            current['route'] = route
+            client.get(route)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return captured
+
+
+def full_scans(plan, statement):
+    """Tables scanned without an index by a statement that filters rows"""
+    if ' WHERE ' not in ' '.join(statement.split()).upper():
+        return []
+    # Scanning a subquery's own rows (materialized or run as a co-routine)
+    # is not a table scan; its tables show up in their own plan lines
+    subqueries = {detail.split(None, 1)[1] for detail in plan if detail.startswith(('MATERIALIZE ', 'CO-ROUTINE '))}
+    return [
+        detail for detail in plan
+        if detail.startswith('SCAN ') and 'INDEX' not in detail
+        and detail.split(None, 1)[1] not in subqueries
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--verbose', action='store_true', help='print every plan, not only failures')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        seed()
+
+    staff = login(app, 'cashier@example.com')
+    staff.post('/add_to_cart/1', data={'quantity': 1})
+    staff.post('/checkout', data={'payment_method': 'cash'})
+
+    captured = capture_selects(app, login(app, 'admin@example.com'), ADMIN_ROUTES)
+    captured += capture_selects(app, staff, STAFF_ROUTES)
+
+    failures = 0
+    with app.app_context():
+        cursor = db.engine.raw_connection().cursor()
+        for route, statement, parameters in captured:
+            plan = [row[3] for row in cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+            scans = full_scans(plan, statement)
+            if scans:
+                failures += 1
+            if scans or args.verbose:
+                print(f"{'❌' if scans else '✅'} {route}")
+                print(f"   {' '.join(statement.split())}")
+                for detail in plan:
+                    print(f"     {detail}")
+
+    os.remove(DB_FILE)
+    print(f"\n{len(captured)} queries checked, {failures} full table scan(s).")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
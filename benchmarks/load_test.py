@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+"""
+Store shift load test
+Drives concurrent cashiers through a full sale (login -> POS search ->
+typeahead -> add_to_cart x k -> checkout -> receipt) while admins poll
+sales_reports and product_stats, then reports p50/p95/p99 latency and
+throughput per route and writes them to a JSON file for comparison
+between commits.
+
+By default it runs in-process through the Flask test client against a
+fresh SQLite database seeded with seed_products.py (--size small: 1k SKUs,
+10k transactions). With --url it drives a running server instead, e.g.
+gunicorn over a database seeded with `python seed_products.py --size large`.
+
+Usage:
+    python benchmarks/load_test.py [--cashiers 8] [--admins 1] [--customers 25] [--items 3]
+    python benchmarks/load_test.py --database sqlite:////path/to/seeded.db
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+# Add parent directory to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+RECEIPT_PATTERN = re.compile(r'/receipt/(\d+)')
+
+# A route whose p95 grows by more than this against the baseline is a regression
+REGRESSION_THRESHOLD = 0.20
+
+
+class TestClientSession:
+    """One user's cookie session against the in-process app"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get('Location', ''), response.get_data(as_text=True)
+
+
+class NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpSession:
+    """One user's cookie session against a running server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()), NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(Request(self.base_url + path, data=body, method=method), timeout=60) as response:
+                return response.status, response.headers.get('Location', ''), response.read().decode()
+        except HTTPError as error:
+            return error.code, error.headers.get('Location', ''), error.read().decode()
+
+
+class Recorder:
+    """Thread-safe per-route latency and error samples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def timed(self, session, route, method, path, data=None, expect=(200,)):
+        start = time.perf_counter()
+        status, location, body = session.request(method, path, data)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples.setdefault(route, []).append(elapsed)
+            if status not in expect:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return status, location, body
+
+
+def login(session, recorder, email, password):
+    _, _, body = recorder.timed(session, 'login_form', 'GET', '/auth/login')
+    token = CSRF_PATTERN.search(body).group(1)
+    status, _, _ = recorder.timed(session, 'login', 'POST', '/auth/login',
+                                  {'email': email, 'password': password, 'csrf_token': token}, expect=(302,))
+    if status != 302:
+        raise RuntimeError(f'login failed for {email}')
+    return token
+
+
+def cashier_shift(make_session, recorder, email, password, args, seed, stop):
+    from seed_products import WORDS
+
+    rng = random.Random(seed)
+    session = make_session()
+    token = login(session, recorder, email, password)
+
+    for _ in range(args.customers):
+        if stop.is_set():
+            break
+        word = rng.choice(WORDS)
+        recorder.timed(session, 'pos_search', 'POST', '/pos', {'search_query': word, 'csrf_token': token})
+        _, _, body = recorder.timed(session, 'product_search', 'GET', f'/api/products/search?q={word[:3]}&limit=10')
+        products = [p for p in json.loads(body) if p['stock_quantity'] > 0] if body.startswith('[') else []
+
+        for product in rng.sample(products, min(args.items, len(products))):
+            recorder.timed(session, 'add_to_cart', 'POST', f"/add_to_cart/{product['id']}", {'quantity': 1},
+                           expect=(200, 302))
+
+        status, location, _ = recorder.timed(session, 'checkout', 'POST', '/checkout',
+                                             {'payment_method': rng.choice(('cash', 'card')), 'csrf_token': token},
+                                             expect=(302,))
+        receipt = RECEIPT_PATTERN.search(location)
+        if receipt:
+            recorder.timed(session, 'receipt', 'GET', f'/receipt/{receipt.group(1)}')
+
+
+def admin_watch(make_session, recorder, email, password, stop):
+    session = make_session()
+    login(session, recorder, email, password)
+    while not stop.is_set():
+        recorder.timed(session, 'sales_reports', 'GET', '/sales_reports')
+        recorder.timed(session, 'product_stats', 'GET', '/product_stats')
+
+
+def percentile(sorted_samples, fraction):
+    index = max(0, int(round(fraction * len(sorted_samples))) - 1)
+    return sorted_samples[min(index, len(sorted_samples) - 1)]
+
+
+def summarize(recorder, wall_seconds):
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        samples = sorted(samples)
+        routes[route] = {
+            'requests': len(samples),
+            'errors': recorder.errors.get(route, 0),
+            'throughput_rps': round(len(samples) / wall_seconds, 2),
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 2),
+            'p50_ms': round(percentile(samples, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(samples, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(samples, 0.99) * 1000, 2),
+        }
+    total = sum(route['requests'] for route in routes.values())
+    return routes, {
+        'requests': total,
+        'errors': sum(route['errors'] for route in routes.values()),
+        'wall_seconds': round(wall_seconds, 2),
+        'throughput_rps': round(total / wall_seconds, 2),
+        'sales': routes.get('checkout', {}).get('requests', 0),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path, routes):
+    """Print p95 changes against a previous run; return the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    regressions = 0
+    for route, stats in routes.items():
+        before = baseline['routes'].get(route)
+        if not before or not before['p95_ms']:
+            continue
+        change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms']
+        regressed = change > REGRESSION_THRESHOLD
+        regressions += regressed
+        print(f"  {'❌' if regressed else '✅'} {route:<16} p95 {before['p95_ms']:>9.2f} -> {stats['p95_ms']:>9.2f} ms ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='drive a running server instead of the in-process app')
+    parser.add_argument('--database', help='in-process: use this already-seeded DATABASE_URL')
+    parser.add_argument('--size', default='small', help='in-process: seed_products.py preset for the temp database')
+    parser.add_argument('--cashiers', type=int, default=8, help='concurrent cashiers')
+    parser.add_argument('--admins', type=int, default=1, help='concurrent admins polling reports')
+    parser.add_argument('--customers', type=int, default=25, help='sales per cashier')
+    parser.add_argument('--items', type=int, default=3, help='cart lines per sale')
+    parser.add_argument('--duration', type=float, help='stop after this many seconds even if sales remain')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--output', default='load_test_results.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='previous results file; exit non-zero on p95 regressions')
+    args = parser.parse_args()
+
+    db_file = None
+    if args.url:
+        make_session = lambda: HttpSession(args.url)
+    else:
+        if not args.database:
+            db_file = os.path.join(tempfile.mkdtemp(), 'load_test.db')
+            os.environ['DATABASE_URL'] = f'sqlite:///{db_file}'
+        else:
+            os.environ['DATABASE_URL'] = args.database
+
+        from app import create_app
+        from seed_products import SIZES, seed_synthetic
+        app = create_app()
+        if db_file:
+            with app.app_context():
+                from app import db
+                db.create_all()
+                preset = SIZES[args.size]
+                print(f"Seeding {preset['products']:,} SKUs and {preset['transactions']:,} transactions...")
+                seed_synthetic(preset['products'], preset['transactions'], max(args.cashiers, 1), 90, args.seed)
+        make_session = lambda: TestClientSession(app)
+
+    from seed_products import ADMIN_EMAIL, CASHIER_EMAIL, LOADTEST_PASSWORD
+
+    recorder = Recorder()
+    stop = threading.Event()
+    cashiers = [
+        threading.Thread(target=cashier_shift, args=(
+            make_session, recorder, CASHIER_EMAIL.format(i), LOADTEST_PASSWORD, args, args.seed * 1000 + i, stop))
+        for i in range(1, args.cashiers + 1)
+    ]
+    admins = [
+        threading.Thread(target=admin_watch, args=(make_session, recorder, ADMIN_EMAIL, LOADTEST_PASSWORD, stop))
+        for _ in range(args.admins)
+    ]
+
+    print(f"Running {args.cashiers} cashier(s) x {args.customers} sale(s) with {args.admins} admin(s)...")
+    start = time.perf_counter()
+    for thread in cashiers + admins:
+        thread.start()
+    if args.duration:
+        threading.Timer(args.duration, stop.set).start()
+    for thread in cashiers:
+        thread.join()
+    stop.set()
+    for thread in admins:
+        thread.join()
+    wall_seconds = time.perf_counter() - start
+
+    routes, totals = summarize(recorder, wall_seconds)
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'target': args.url or 'test-client',
+            'python': platform.python_version(),
+            'args': vars(args),
+        },
+        'totals': totals,
+        'routes': routes,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'route':<16} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in routes.items():
+        print(f"{route:<16} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    print(f"\n✅ {totals['sales']} sales, {totals['requests']} requests in {totals['wall_seconds']}s "
+          f"({totals['throughput_rps']} req/s). Results written to {args.output}")
+
+    if db_file:
+        os.remove(db_file)
+
+    if args.compare and compare(args.compare, routes):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Money exactness check
+Generates random baskets totalling millions of sale lines and checks that
+integer-cents totals stay exact end to end:
+
+  * cart_totals(): subtotal + VAT == grand total, and the VAT equals the sum
+    of the per-line VAT recorded in the sales rollup
+  * SQL SUM() over Money columns equals the exact Decimal sum in Python
+
+The float sum of the same lines is reported alongside to show the drift
+the old db.Float columns accumulated.
+
+Usage:
+    python benchmarks/money_exactness.py [--lines 2000000] [--seed 7]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import Column, MetaData, Table, create_engine, func, insert, select
+from app.checkout import cart_totals
+from app.database import Money
+from app.utils import from_cents, vat_for
+
+CHUNK_SIZE = 50_000
+
+
+def random_basket(rng):
+    return [
+        {'unit_price': from_cents(rng.randint(1, 250_000)), 'quantity': rng.randint(1, 24)}
+        for _ in range(rng.randint(1, 60))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=2_000_000, help='number of synthetic sale lines')
+    parser.add_argument('--seed', type=int, default=7, help='random seed')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engine = create_engine('sqlite://')
+    metadata = MetaData()
+    lines = Table('line', metadata, Column('line_total', Money), Column('vat_amount', Money))
+    metadata.create_all(engine)
+
+    exact_total = exact_vat = Decimal('0.00')
+    float_total = 0.0
+    baskets = written = 0
+    pending = []
+    start = time.perf_counter()
+
+    with engine.begin() as conn:
+        while written < args.lines:
+            basket = random_basket(rng)
+            subtotal, vat, grand_total = cart_totals(basket)
+            line_vat = sum(vat_for(item['unit_price'] * item['quantity']) for item in basket)
+            assert subtotal + vat == grand_total, basket
+            assert vat == line_vat, basket
+
+            for item in basket:
+                line_total = item['unit_price'] * item['quantity']
+                pending.append({'line_total': line_total, 'vat_amount': vat_for(line_total)})
+                float_total += float(item['unit_price']) * item['quantity']
+            exact_total += subtotal
+            exact_vat += vat
+            baskets += 1
+            written += len(basket)
+
+            if len(pending) >= CHUNK_SIZE:
+                conn.execute(insert(lines), pending)
+                pending = []
+        if pending:
+            conn.execute(insert(lines), pending)
+
+        sql_total, sql_vat = conn.execute(
+            select(func.sum(lines.c.line_total), func.sum(lines.c.vat_amount))
+        ).one()
+
+    elapsed = time.perf_counter() - start
+    print(f"Lines:            {written:,} in {baskets:,} baskets ({elapsed:.1f}s)")
+    print(f"Exact subtotal:   R {exact_total:,}")
+    print(f"SQL SUM subtotal: R {sql_total:,}")
+    print(f"Exact VAT:        R {exact_vat:,}")
+    print(f"SQL SUM VAT:      R {sql_vat:,}")
+    print(f"Float subtotal:   R {float_total:,.6f} (drift {float_total - float(exact_total):+.6f})")
+
+    if sql_total != exact_total or sql_vat != exact_vat:
+        print("❌ Integer-cents totals drifted")
+        sys.exit(1)
+    print("✅ Integer-cents totals are exact")
+
+
+if __name__ == '__main__':
+    main()
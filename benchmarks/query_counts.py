@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Query count check
+Renders the cashier's sales history and receipt pages against a small and
+a large history (more transactions, more lines per transaction) and counts
+the SQL statements each request issues. Exits non-zero if a route's count
+grows with the data (an N+1) or exceeds its budget.
+
+Usage:
+    python benchmarks/query_counts.py [--verbose]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'query_counts.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import event
+from app import create_app, db, bcrypt
+from app.models import User, Product, Transaction, Sale
+
+# Statements per request once the user cache is warm: the page's own queries only
+BUDGETS = {
+    '/sales_history': 3,  # shift totals (for the count), page of transactions, their sales
+    '/receipt/<id>': 2,   # transaction, its sales with products
+}
+
+# (transactions, lines per transaction)
+SIZES = [(3, 2), (40, 25)]
+
+
+def seed(transactions, lines):
+    password = bcrypt.generate_password_hash('counts123').decode('utf-8')
+    cashier = User(name='Cashier', email='cashier@example.com', password_hash=password, role='staff')
+    db.session.add(cashier)
+    products = [
+        Product(product_code=f'QC-{i:03d}', name=f'Count Product {i}', category='Counts',
+                price=5 + i, stock_quantity=1000)
+        for i in range(lines)
+    ]
+    db.session.add_all(products)
+    db.session.flush()
+
+    for _ in range(transactions):
+        transaction = Transaction(cashier=cashier, subtotal=0, vat_amount=0, grand_total=0, payment_method='cash')
+        for product in products:
+            transaction.sales.append(Sale(product=product, quantity=2, unit_price=product.price,
+                                          line_total=product.price * 2))
+        db.session.add(transaction)
+    db.session.commit()
+    return transaction.id
+
+
+def count_queries(app, client, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(' '.join(statement.split()))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+        assert response.status_code == 200, f'{url} returned {response.status_code}'
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def measure(transactions, lines):
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        last_id = seed(transactions, lines)
+
+    client = app.test_client()
+    client.post('/auth/login', data={'email': 'cashier@example.com', 'password': 'counts123'})
+    client.get('/staff_dashboard')  # loads the user into the user cache
+    return {
+        '/sales_history': count_queries(app, client, '/sales_history'),
+        '/receipt/<id>': count_queries(app, client, f'/receipt/{last_id}'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--verbose', action='store_true', help='print every statement')
+    args = parser.parse_args()
+
+    results = [measure(*size) for size in SIZES]
+
+    failures = 0
+    for route, budget in BUDGETS.items():
+        counts = [len(result[route]) for result in results]
+        ok = len(set(counts)) == 1 and counts[0] <= budget
+        failures += not ok
+        sizes = ', '.join(f'{t} txns x {l} lines: {c}' for (t, l), c in zip(SIZES, counts))
+        print(f"{'✅' if ok else '❌'} {route:<16} budget {budget}  ({sizes})")
+        if args.verbose or not ok:
+            for statement in results[-1][route]:
+                print(f"     {statement}")
+
+    os.remove(DB_FILE)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""
+Concurrent checkout stress test
+Runs several worker processes (like gunicorn workers), each with several
+threads acting as tills. Every till reserves a few products and checks out,
+over and over, against one shared SQLite database. Lower --stock to make
+the tills also compete for the last units.
+
+Exits non-zero if any checkout failed with "database is locked" (or any
+other database error), or if stock does not add up afterwards: for every
+product, opening stock = stock now + units sold + units still reserved,
+and no stock level is negative.
+
+--baseline reproduces the old engine defaults (rollback journal,
+synchronous=FULL, pysqlite's 5 s lock wait) for comparison.
+
+Usage:
+    python benchmarks/stress_checkout.py [--workers 8] [--threads 4] [--sales 25] [--baseline]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.exc import OperationalError
+
+BASELINE = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_BUSY_TIMEOUT': '5000',
+    'SQLITE_MMAP_SIZE': '0',
+    'SQLITE_CACHE_KB': '2000',
+}
+
+
+def make_app():
+    from app import create_app
+    app = create_app()
+    app.config['CART_BACKEND'] = 'memory'
+    app.config['RESERVATION_SWEEP_INTERVAL'] = 0
+    return app
+
+
+def seed(products, stock, cashiers):
+    from app import db
+    from app.models import User, Product
+    db.session.add_all([
+        User(name=f'Till {i}', email=f'till{i}@example.com', password_hash='-', role='staff')
+        for i in range(cashiers)
+    ])
+    db.session.add_all([
+        Product(product_code=f'ST-{i:03d}', name=f'Stress Product {i}', category='Stress',
+                price=random.Random(i).randint(100, 5000) / 100, stock_quantity=stock)
+        for i in range(products)
+    ])
+    db.session.commit()
+
+
+def till(app, cashier_id, seed_value, args, results):
+    from app import db
+    from app.checkout import complete_sale
+    from app.models import Product
+    from app.reservations import reserve, release, InsufficientStockError
+
+    rng = random.Random(seed_value)
+    counts = {'completed': 0, 'out_of_stock': 0, 'locked': 0, 'failed': 0}
+    latencies = []
+    with app.app_context():
+        products = db.session.query(Product.id, Product.name, Product.price).all()
+        for sale in range(args.sales):
+            cart_id = f'{cashier_id}-{sale}'
+            cart = []
+            start = time.perf_counter()
+            try:
+                for product in rng.sample(products, args.items):
+                    quantity = rng.randint(1, 3)
+                    try:
+                        reserve(cart_id, product, quantity)
+                    except InsufficientStockError:
+                        counts['out_of_stock'] += 1
+                        continue
+                    cart.append({'product_id': product.id, 'quantity': quantity, 'unit_price': product.price})
+                if cart:
+                    complete_sale(cashier_id, cart, rng.choice(('cash', 'card')), cart_id)
+                    counts['completed'] += 1
+                    latencies.append(time.perf_counter() - start)
+            except InsufficientStockError:
+                counts['out_of_stock'] += 1
+                release(cart_id)
+            except OperationalError as e:
+                counts['locked' if 'locked' in str(e) else 'failed'] += 1
+                print(f'   ❌ till {cashier_id}: {e.orig}', file=sys.stderr)
+            except Exception as e:
+                counts['failed'] += 1
+                print(f'   ❌ till {cashier_id}: {e!r}', file=sys.stderr)
+        db.session.remove()
+    results.put((counts, latencies))
+
+
+def worker(index, database_url, env, args, results):
+    os.environ.update(env, DATABASE_URL=database_url)
+    app = make_app()
+    threads = [
+        threading.Thread(target=till, args=(app, index * args.threads + t + 1, index * 1000 + t, args, results))
+        for t in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def check_stock(args):
+    """Return a list of products whose stock does not add up"""
+    from app import db
+    from app.models import Product, Sale, StockReservation
+    sold = dict(db.session.query(Sale.product_id, db.func.sum(Sale.quantity)).group_by(Sale.product_id).all())
+    held = dict(db.session.query(StockReservation.product_id, db.func.sum(StockReservation.quantity))
+                .group_by(StockReservation.product_id).all())
+    problems = []
+    for product in Product.query.all():
+        accounted = product.stock_quantity + sold.get(product.id, 0) + held.get(product.id, 0)
+        if product.stock_quantity < 0 or accounted != args.stock:
+            problems.append(f'{product.product_code}: stock {product.stock_quantity}, sold {sold.get(product.id, 0)}, '
+                            f'held {held.get(product.id, 0)} (opening {args.stock})')
+    return problems
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))] if samples else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8, help='worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='tills (threads) per worker')
+    parser.add_argument('--sales', type=int, default=25, help='checkouts per till')
+    parser.add_argument('--items', type=int, default=3, help='products per sale')
+    parser.add_argument('--products', type=int, default=30, help='catalog size')
+    parser.add_argument('--stock', type=int, default=200, help='opening stock per product')
+    parser.add_argument('--baseline', action='store_true', help='use the old SQLite defaults')
+    args = parser.parse_args()
+
+    env = dict(BASELINE) if args.baseline else {}
+    db_file = os.path.join(tempfile.mkdtemp(), 'stress_checkout.db')
+    database_url = f'sqlite:///{db_file}'
+    os.environ.update(env, DATABASE_URL=database_url)
+
+    from app import db
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        seed(args.products, args.stock, args.workers * args.threads)
+        db.engine.dispose()
+
+    tills = args.workers * args.threads
+    mode = 'old defaults' if args.baseline else 'tuned pragmas'
+    print(f'{args.workers} worker(s) x {args.threads} till(s) x {args.sales} sale(s) on SQLite ({mode})...')
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(i, database_url, env, args, results))
+        for i in range(args.workers)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in range(tills)]
+    for process in processes:
+        process.join()
+    seconds = time.perf_counter() - start
+
+    totals = {key: sum(counts[key] for counts, _ in outcomes) for key in outcomes[0][0]}
+    latencies = [latency for _, samples in outcomes for latency in samples]
+    with app.app_context():
+        problems = check_stock(args)
+
+    print(f"\n   completed checkouts : {totals['completed']} ({totals['completed'] / seconds:.1f}/s)")
+    print(f"   p50 / p95 checkout  : {percentile(latencies, 0.5) * 1000:.1f} / {percentile(latencies, 0.95) * 1000:.1f} ms")
+    print(f"   out of stock        : {totals['out_of_stock']}")
+    print(f"   database locked     : {totals['locked']}")
+    print(f"   other failures      : {totals['failed']}")
+    for problem in problems:
+        print(f'   ❌ {problem}')
+
+    os.remove(db_file)
+    ok = not totals['locked'] and not totals['failed'] and not problems
+    print(f"\n{'✅ No lock errors, stock adds up' if ok else '❌ Checkout stress test failed'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+Offline till sync check
+Runs the app on a local stand-in server (werkzeug, in a thread, over a
+fresh SQLite database), then drives offline_till.py against it:
+
+  1. snapshot the catalog, and check a second refresh is a 304
+  2. take the till "offline" and queue --sales sales from the snapshot,
+     the last one including a product deleted on the server meanwhile
+  3. sync, losing the response to the second batch after the server has
+     recorded it (as on a dropped connection), then sync again
+
+Exits non-zero unless every sale was recorded exactly once (the lost
+batch comes back as duplicates), the deleted product's sale was
+rejected, stock went down by exactly the units sold (below zero where the
+till oversold its snapshot), and the transactions, daily sales rollup and
+cashier shift totals all match what the till rang up.
+
+Usage:
+    python benchmarks/till_sync_check.py [--sales 600] [--batch-size 200] [--products 60] [--stock 20]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import offline_till
+
+EMAIL = 'till@example.com'
+PASSWORD = 'till-check-123'
+
+
+class LossyServerSession(offline_till.ServerSession):
+    """Loses the response to the Nth sync request, after the server handled it"""
+
+    def __init__(self, *args, lose_sync=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lose_sync = lose_sync
+        self.syncs = 0
+
+    def request_json(self, method, path, payload=None, headers=None):
+        response = super().request_json(method, path, payload, headers)
+        if path == '/api/till/sync':
+            self.syncs += 1
+            if self.syncs == self.lose_sync:
+                raise ConnectionResetError('response lost')
+        return response
+
+
+def seed(args):
+    from app import db, bcrypt
+    from app.models import User, Product
+    cashier = User(name='Offline Till', email=EMAIL, role='staff',
+                   password_hash=bcrypt.generate_password_hash(PASSWORD).decode('utf-8'))
+    db.session.add(cashier)
+    db.session.add_all([
+        Product(product_code=f'OT-{i:03d}', name=f'Till Product {i}', category=f'Aisle {i % 5}',
+                price=random.Random(i).randint(100, 5000) / 100, stock_quantity=args.stock)
+        for i in range(args.products + 1)  # the last one is deleted once the till has it
+    ])
+    db.session.commit()
+    return cashier.id
+
+
+def check_server(args, cashier_id, till_totals, till_units):
+    """Return a list of ways the server's books differ from what the till rang up"""
+    from app import db
+    from app.models import Transaction, Sale, Product, DailySalesRollup, CashierShiftTotals
+    problems = []
+
+    transactions = db.session.query(
+        db.func.count(Transaction.id), db.func.count(db.func.distinct(Transaction.client_ref)),
+        db.func.coalesce(db.func.sum(Transaction.grand_total), 0)
+    ).filter(Transaction.cashier_id == cashier_id).one()
+    count, refs, grand_total = transactions
+    expected_total = offline_till.format_cents(till_totals['grand_total'])
+    if count != till_totals['sales'] or refs != count:
+        problems.append(f"{count} transactions ({refs} client refs) for {till_totals['sales']} synced sales")
+    if f'{grand_total:.2f}' != expected_total:
+        problems.append(f'transactions total R{grand_total:.2f}, the till rang up R{expected_total}')
+
+    sold = dict(db.session.query(Sale.product_id, db.func.sum(Sale.quantity)).group_by(Sale.product_id).all())
+    for product in Product.query.all():
+        if sold.get(product.id, 0) != till_units.get(product.id, 0):
+            problems.append(f'{product.product_code}: {sold.get(product.id, 0)} sold, the till sold {till_units.get(product.id, 0)}')
+        if product.stock_quantity != args.stock - till_units.get(product.id, 0):
+            problems.append(f'{product.product_code}: stock {product.stock_quantity}, '
+                            f'expected {args.stock - till_units.get(product.id, 0)}')
+
+    rollup_units = db.session.query(db.func.coalesce(db.func.sum(DailySalesRollup.quantity), 0)).scalar()
+    if rollup_units != sum(till_units.values()):
+        problems.append(f'daily sales rollup has {rollup_units} units, the till sold {sum(till_units.values())}')
+    shifts = db.session.query(
+        db.func.coalesce(db.func.sum(CashierShiftTotals.transactions), 0),
+        db.func.coalesce(db.func.sum(CashierShiftTotals.grand_total), 0)
+    ).filter(CashierShiftTotals.cashier_id == cashier_id).one()
+    if shifts[0] != till_totals['sales'] or f'{shifts[1]:.2f}' != expected_total:
+        problems.append(f'shift totals: {shifts[0]} transactions, R{shifts[1]:.2f}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sales', type=int, default=600, help='sales to queue while offline')
+    parser.add_argument('--batch-size', type=int, default=200, help='sales per sync request')
+    parser.add_argument('--products', type=int, default=60, help='catalog size')
+    parser.add_argument('--stock', type=int, default=20, help='opening stock per product')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'server.db')}",
+        BCRYPT_LOG_ROUNDS='4',
+    )
+
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from app.models import Product
+    app = create_app()
+    app.config['CART_BACKEND'] = 'memory'
+    app.config['RESERVATION_SWEEP_INTERVAL'] = 0
+    with app.app_context():
+        db.create_all()
+        cashier_id = seed(args)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request log lines
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    print(f'Stand-in server at {url}: {args.products} products x {args.stock} in stock')
+
+    problems = []
+    store = offline_till.TillStore(os.path.join(workdir, 'till.db'))
+    session = LossyServerSession(url, EMAIL, PASSWORD, lose_sync=2)
+
+    # 1. Snapshot
+    if not offline_till.refresh_catalog(store, session):
+        problems.append('first catalog refresh did not load a snapshot')
+    if offline_till.refresh_catalog(store, session):
+        problems.append('unchanged catalog was downloaded again instead of a 304')
+
+    # 2. Offline: the server loses a product, the till keeps selling
+    gone_code = f'OT-{args.products:03d}'
+    with app.app_context():
+        gone = Product.query.filter_by(product_code=gone_code).one()
+        gone_id = gone.id
+        db.session.delete(gone)
+        db.session.commit()
+
+    rng = random.Random(42)
+    codes = [f'OT-{i:03d}' for i in range(args.products)]
+    till_units = {}
+    till_totals = {'sales': 0, 'grand_total': 0}
+    rejected_ref = None
+    for sale in range(args.sales):
+        items = [(code, rng.randint(1, 3)) for code in rng.sample(codes, rng.randint(1, 4))]
+        if sale == args.sales - 1:
+            rejected_ref, _, _, _ = store.queue_sale(items + [(gone_code, 1)], 'cash')
+            continue
+        _, _, _, grand_total = store.queue_sale(items, rng.choice(('cash', 'card')))
+        till_totals['sales'] += 1
+        till_totals['grand_total'] += grand_total
+        for code, quantity in items:
+            product_id = store.product(code)['id']
+            till_units[product_id] = till_units.get(product_id, 0) + quantity
+    oversold = sum(1 for units in till_units.values() if units > args.stock)
+    print(f'Queued {args.sales} sales offline ({oversold} products oversold against the snapshot)')
+
+    # 3. Sync, lose a response, sync again
+    start = time.perf_counter()
+    try:
+        offline_till.sync(store, session, args.batch_size)
+        problems.append('the lost response did not interrupt the sync')
+    except OSError as e:
+        print(f'   sync interrupted ({e}) with {store.counts().get(offline_till.QUEUED, 0)} sales still queued')
+    totals = offline_till.sync(store, session, args.batch_size)
+    seconds = time.perf_counter() - start
+    requests = session.syncs
+    print(f'   resynced: {totals}')
+    print(f'   {args.sales} sales in {requests} requests, {seconds:.2f} s ({args.sales / seconds:.0f} sales/s)')
+
+    if totals.get('duplicate', 0) != min(args.batch_size, args.sales - args.batch_size):
+        problems.append(f"{totals.get('duplicate', 0)} duplicates after the lost batch of {args.batch_size}")
+    counts = store.counts()
+    if counts.get(offline_till.QUEUED) or counts.get(offline_till.REJECTED) != 1:
+        problems.append(f'till queue after sync: {counts}')
+    rejected = store.db.execute('SELECT error FROM queued_sale WHERE client_ref = ?', (rejected_ref,)).fetchone()
+    if rejected is None or f'#{gone_id}' not in (rejected['error'] or ''):
+        problems.append(f"sale of the deleted product: {dict(rejected) if rejected else None}")
+
+    with app.app_context():
+        problems += check_server(args, cashier_id, till_totals, till_units)
+
+    # The till's refreshed snapshot agrees with the server
+    offline_till.refresh_catalog(store, session)
+    till_stock = {row['id']: row['stock_quantity'] for row in store.db.execute('SELECT id, stock_quantity FROM product')}
+    with app.app_context():
+        server_stock = dict(db.session.query(Product.id, Product.stock_quantity).all())
+    if till_stock != server_stock:
+        problems.append('the till snapshot after sync differs from server stock')
+
+    server.shutdown()
+    store.close()
+    for problem in problems:
+        print(f'   ❌ {problem}')
+    print(f"\n{'✅ Every offline sale recorded once, books add up' if not problems else '❌ Till sync check failed'}")
+    sys.exit(0 if not problems else 1)
+
+
+if __name__ == '__main__':
+    main()
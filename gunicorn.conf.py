@@ -0,0 +1,72 @@
+"""
+Gunicorn settings for production: gunicorn -c gunicorn.conf.py run:app
+
+Every setting can be overridden from the environment (or .env):
+
+    GUNICORN_WORKER_CLASS  gthread (default), sync or gevent
+    WEB_CONCURRENCY        worker processes (default: derived from CPU cores)
+    GUNICORN_THREADS       threads per gthread worker (default 4)
+    GUNICORN_PRELOAD       load the app once in the master before forking (default on)
+    GUNICORN_MAX_REQUESTS  recycle a worker after this many requests (default 1000, 0 = never)
+    GUNICORN_TIMEOUT       seconds a silent worker may run before it is restarted (default 120)
+    GUNICORN_ACCESS_LOG    access log file (default: stdout, empty = off)
+    PORT                   port to listen on (default 8000)
+
+gthread is the default because a request that waits (on the database, a
+streamed export or a password hash running in the bcrypt pool) then only
+ties up one thread instead of a whole worker. gevent needs
+`pip install gevent`.
+"""
+
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _flag(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+cores = multiprocessing.cpu_count()
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'sync':
+    # One request per process; the classic (2 x cores) + 1
+    default_workers = cores * 2 + 1
+elif worker_class == 'gthread':
+    # Threads carry the concurrency; one process per core keeps the GIL contention down
+    default_workers = cores + 1
+else:
+    default_workers = cores
+workers = int(os.getenv('WEB_CONCURRENCY', default_workers))
+threads = int(os.getenv('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100))  # gevent only
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Import the app (and its dependencies) once in the master; workers fork
+# from it, start faster and share the read-only pages
+preload_app = _flag('GUNICORN_PRELOAD', 'true')
+
+# Recycle workers now and then to bound slow memory growth, staggered so
+# they do not all restart at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Large exports stream for longer than the 30s default on sync workers
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None  # empty = off
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # With preload_app the master built the engine; a forked worker must not
+    # reuse pooled connections the master (or a sibling) may hold
+    from app import db
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
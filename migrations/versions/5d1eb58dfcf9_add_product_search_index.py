@@ -0,0 +1,76 @@
+"""add product search index
+
+Revision ID: 5d1eb58dfcf9
+Revises: 927d57a10aab
+Create Date: 2026-10-18 09:12:41.208733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1eb58dfcf9'
+down_revision = '927d57a10aab'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        name, product_code, content='product', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_ai AFTER INSERT ON product BEGIN
+        INSERT INTO product_search (rowid, name, product_code) VALUES (new.id, new.name, new.product_code);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_ad AFTER DELETE ON product BEGIN
+        INSERT INTO product_search (product_search, rowid, name, product_code)
+        VALUES ('delete', old.id, old.name, old.product_code);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_search_au AFTER UPDATE OF name, product_code ON product BEGIN
+        INSERT INTO product_search (product_search, rowid, name, product_code)
+        VALUES ('delete', old.id, old.name, old.product_code);
+        INSERT INTO product_search (rowid, name, product_code) VALUES (new.id, new.name, new.product_code);
+    END
+    """,
+    "INSERT INTO product_search (product_search) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    'DROP TRIGGER IF EXISTS product_search_au',
+    'DROP TRIGGER IF EXISTS product_search_ad',
+    'DROP TRIGGER IF EXISTS product_search_ai',
+    'DROP TABLE IF EXISTS product_search',
+]
+
+POSTGRESQL_UPGRADE = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS ix_product_name_trgm ON product USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_product_code_trgm ON product USING gin (product_code gin_trgm_ops)',
+]
+
+POSTGRESQL_DOWNGRADE = [
+    'DROP INDEX IF EXISTS ix_product_code_trgm',
+    'DROP INDEX IF EXISTS ix_product_name_trgm',
+]
+
+
+def _run(statements_by_dialect):
+    dialect = op.get_bind().dialect.name
+    for statement in statements_by_dialect.get(dialect, []):
+        op.execute(sa.text(statement))
+
+
+def upgrade():
+    _run({'sqlite': SQLITE_UPGRADE, 'postgresql': POSTGRESQL_UPGRADE})
+
+
+def downgrade():
+    _run({'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRESQL_DOWNGRADE})
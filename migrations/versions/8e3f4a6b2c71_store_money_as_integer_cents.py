@@ -0,0 +1,52 @@
+"""store money as integer cents
+
+Revision ID: 8e3f4a6b2c71
+Revises: 15d247b547f3
+Create Date: 2026-10-18 09:12:47.302118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3f4a6b2c71'
+down_revision = '15d247b547f3'
+branch_labels = None
+depends_on = None
+
+MONEY_COLUMNS = {
+    'product': ['price'],
+    'transaction': ['subtotal', 'vat_amount', 'grand_total'],
+    'sale': ['unit_price', 'line_total'],
+    'daily_sales_rollup': ['revenue', 'vat_amount'],
+}
+
+
+def upgrade():
+    for table, columns in MONEY_COLUMNS.items():
+        op.execute(
+            f'UPDATE "{table}" SET '
+            + ', '.join(f'{column} = ROUND({column} * 100)' for column in columns)
+        )
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                       existing_type=sa.Float(),
+                       type_=sa.Integer(),
+                       existing_nullable=False,
+                       postgresql_using=f'{column}::integer')
+
+
+def downgrade():
+    for table, columns in MONEY_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                       existing_type=sa.Integer(),
+                       type_=sa.Float(),
+                       existing_nullable=False)
+        op.execute(
+            f'UPDATE "{table}" SET '
+            + ', '.join(f'{column} = {column} / 100.0' for column in columns)
+        )
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+"""
+Offline till for Smart-Retail POS
+Keeps a till selling when the link to the server is slow or down
+
+The till works from a local SQLite file holding
+  - a snapshot of the catalog, refreshed from /api/till/catalog whenever
+    the server can be reached (a 304 when nothing changed since), and
+  - a queue of completed sales, each with its own client_ref.
+
+Selling only touches the local file. `sync` posts the queued sales to
+/api/till/sync in batches as the cashier; the server records each
+client_ref once, so a sync that fails half way is simply run again.
+
+Usage:
+    python offline_till.py --url https://pos.example.com --email cashier@example.com refresh
+    python offline_till.py sell P0001:2 P0042 --payment card
+    python offline_till.py --url https://pos.example.com --email cashier@example.com sync
+    python offline_till.py status
+
+The password is read from TILL_PASSWORD, or prompted for. --url and
+--email default to TILL_SERVER_URL and TILL_EMAIL.
+"""
+
+import argparse
+import getpass
+import json
+import os
+import re
+import sqlite3
+import sys
+import uuid
+from datetime import datetime
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.utils import vat_cents
+
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS product (
+    id INTEGER PRIMARY KEY,
+    product_code TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    price INTEGER NOT NULL,             -- cents
+    stock_quantity INTEGER NOT NULL     -- server stock at the snapshot, less queued sales
+);
+CREATE TABLE IF NOT EXISTS setting (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS queued_sale (
+    client_ref TEXT PRIMARY KEY,
+    sold_at TEXT NOT NULL,              -- ISO 8601, UTC
+    payment_method TEXT NOT NULL,
+    lines TEXT NOT NULL,                -- JSON, as posted to /api/till/sync
+    status TEXT NOT NULL DEFAULT 'queued',  -- 'queued', 'synced', 'rejected'
+    transaction_id INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_queued_sale_status ON queued_sale (status);
+"""
+
+QUEUED = 'queued'
+SYNCED = 'synced'
+REJECTED = 'rejected'
+
+
+class SyncError(RuntimeError):
+    """The server answered, but not with what the till asked for"""
+
+
+def format_cents(cents):
+    return f"{'-' if cents < 0 else ''}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+
+class TillStore:
+    """The till's local SQLite file: catalog snapshot and sale queue"""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        # A queued sale must survive a power cut; in WAL mode that costs one
+        # sync of the log per sale instead of several of the database file
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=FULL')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def setting(self, name):
+        row = self.db.execute('SELECT value FROM setting WHERE name = ?', (name,)).fetchone()
+        return row['value'] if row else None
+
+    def _set(self, name, value):
+        self.db.execute('INSERT OR REPLACE INTO setting (name, value) VALUES (?, ?)', (name, value))
+
+    def replace_catalog(self, etag, fields, rows):
+        """Swap in a new catalog snapshot, keeping queued sales taken off its stock"""
+        with self.db:
+            self.db.execute('DELETE FROM product')
+            self.db.executemany(
+                'INSERT INTO product (id, product_code, name, category, price, stock_quantity) VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (row['id'], row['product_code'], row['name'], row['category'],
+                     round(row['price'] * 100), row['stock_quantity'])
+                    for row in (dict(zip(fields, values)) for values in rows)
+                ]
+            )
+            for (lines,) in self.db.execute('SELECT lines FROM queued_sale WHERE status = ?', (QUEUED,)).fetchall():
+                self._take_stock(json.loads(lines))
+            self._set('catalog_etag', etag)
+            self._set('catalog_updated_at', datetime.utcnow().isoformat(timespec='seconds'))
+
+    def _take_stock(self, lines):
+        self.db.executemany(
+            'UPDATE product SET stock_quantity = stock_quantity - ? WHERE id = ?',
+            [(line['quantity'], line['product_id']) for line in lines]
+        )
+
+    def product(self, product_code):
+        return self.db.execute('SELECT * FROM product WHERE product_code = ?', (product_code,)).fetchone()
+
+    def queue_sale(self, items, payment_method):
+        """Queue a completed sale of [(product_code, quantity)] at snapshot prices.
+
+        Returns (client_ref, subtotal, vat, grand_total), amounts in cents.
+        Raises KeyError for a product code missing from the snapshot.
+        """
+        lines = []
+        subtotal = vat = 0
+        for product_code, quantity in items:
+            product = self.product(product_code)
+            if product is None:
+                raise KeyError(product_code)
+            line_total = product['price'] * quantity
+            subtotal += line_total
+            vat += vat_cents(line_total)
+            lines.append({
+                'product_id': product['id'],
+                'quantity': quantity,
+                'unit_price': format_cents(product['price'])
+            })
+
+        client_ref = uuid.uuid4().hex
+        with self.db:
+            self.db.execute(
+                'INSERT INTO queued_sale (client_ref, sold_at, payment_method, lines) VALUES (?, ?, ?, ?)',
+                (client_ref, datetime.utcnow().isoformat(), payment_method, json.dumps(lines))
+            )
+            self._take_stock(lines)
+        return client_ref, subtotal, vat, subtotal + vat
+
+    def pending(self, limit):
+        """The oldest queued sales, as /api/till/sync payloads"""
+        rows = self.db.execute(
+            'SELECT client_ref, sold_at, payment_method, lines FROM queued_sale'
+            ' WHERE status = ? ORDER BY rowid LIMIT ?', (QUEUED, limit)
+        ).fetchall()
+        return [
+            {
+                'client_ref': row['client_ref'],
+                'sold_at': row['sold_at'],
+                'payment_method': row['payment_method'],
+                'lines': json.loads(row['lines'])
+            }
+            for row in rows
+        ]
+
+    def record_results(self, results):
+        """Mark queued sales synced or rejected from a /api/till/sync response"""
+        with self.db:
+            self.db.executemany(
+                'UPDATE queued_sale SET status = ?, transaction_id = ?, error = ? WHERE client_ref = ?',
+                [
+                    (REJECTED if result['status'] == 'rejected' else SYNCED,
+                     result.get('transaction_id'), result.get('error'), result['client_ref'])
+                    for result in results if result.get('client_ref')
+                ]
+            )
+
+    def counts(self):
+        """Queued sales by status"""
+        return dict(self.db.execute('SELECT status, COUNT(*) FROM queued_sale GROUP BY status').fetchall())
+
+
+class NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class ServerSession:
+    """Cookie session with the POS server, logged in as a cashier"""
+
+    def __init__(self, base_url, email, password, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.password = password
+        self.timeout = timeout
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()), NoRedirect())
+        self.logged_in = False
+
+    def _open(self, method, path, body=None, headers=None):
+        request = Request(self.base_url + path, data=body, method=method, headers=headers or {})
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.headers, response.read()
+        except HTTPError as error:
+            return error.code, error.headers, error.read()
+
+    def login(self):
+        _, _, body = self._open('GET', '/auth/login')
+        match = CSRF_PATTERN.search(body.decode())
+        if match is None:
+            raise SyncError('no login form at ' + self.base_url)
+        form = urlencode({'email': self.email, 'password': self.password, 'csrf_token': match.group(1)})
+        status, headers, _ = self._open('POST', '/auth/login', form.encode())
+        # A successful login redirects away from the login page
+        if status != 302 or '/auth/login' in headers.get('Location', ''):
+            raise SyncError(f'login failed for {self.email}')
+        self.logged_in = True
+
+    def request_json(self, method, path, payload=None, headers=None):
+        """Return (status, headers, parsed JSON or None), logging in again if the session expired"""
+        headers = dict(headers or {})
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+
+        for _ in range(2):
+            if not self.logged_in:
+                self.login()
+            status, response_headers, data = self._open(method, path, body, headers)
+            if status == 302:  # sent to the login page
+                self.logged_in = False
+                continue
+            is_json = response_headers.get('Content-Type', '').startswith('application/json')
+            return status, response_headers, json.loads(data) if is_json and data else None
+        raise SyncError(f'{path}: not logged in')
+
+
+def refresh_catalog(store, server):
+    """Fetch the catalog if it changed since the last snapshot; returns True if it did"""
+    etag = store.setting('catalog_etag')
+    status, headers, data = server.request_json(
+        'GET', '/api/till/catalog', headers={'If-None-Match': etag} if etag else None
+    )
+    if status == 304:
+        return False
+    if status != 200:
+        raise SyncError(f'/api/till/catalog answered {status}')
+    store.replace_catalog(headers.get('ETag'), data['fields'], data['rows'])
+    return True
+
+
+def sync(store, server, batch_size=200):
+    """Post queued sales in batches until none are left; returns {status: sales} for this run"""
+    totals = {}
+    while True:
+        batch = store.pending(batch_size)
+        if not batch:
+            return totals
+        status, _, data = server.request_json('POST', '/api/till/sync', {'sales': batch})
+        if status != 200:
+            raise SyncError(f"/api/till/sync answered {status}: {(data or {}).get('error', '')}")
+        store.record_results(data['results'])
+        for result in data['results']:
+            totals[result['status']] = totals.get(result['status'], 0) + 1
+
+
+def parse_item(text):
+    """'P0001:2' -> ('P0001', 2); the quantity defaults to 1"""
+    product_code, _, quantity = text.partition(':')
+    quantity = int(quantity) if quantity else 1
+    if quantity < 1:
+        raise argparse.ArgumentTypeError(f'{text}: quantity must be at least 1')
+    return product_code, quantity
+
+
+def connect(args):
+    if not args.url or not args.email:
+        sys.exit('--url and --email (or TILL_SERVER_URL and TILL_EMAIL) are required to reach the server')
+    password = os.getenv('TILL_PASSWORD') or getpass.getpass(f'Password for {args.email}: ')
+    return ServerSession(args.url, args.email, password)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--store', default=os.getenv('TILL_STORE', 'till.db'), help='local SQLite file')
+    parser.add_argument('--url', default=os.getenv('TILL_SERVER_URL'), help='POS server, e.g. https://pos.example.com')
+    parser.add_argument('--email', default=os.getenv('TILL_EMAIL'), help='cashier account the till signs in as')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('refresh', help='snapshot the catalog from the server')
+    sell = commands.add_parser('sell', help='queue a completed sale')
+    sell.add_argument('items', nargs='+', type=parse_item, metavar='CODE[:QTY]')
+    sell.add_argument('--payment', choices=('cash', 'card'), default='cash')
+    sync_parser = commands.add_parser('sync', help='send queued sales to the server')
+    sync_parser.add_argument('--batch-size', type=int, default=200)
+    commands.add_parser('status', help='show the snapshot age and the queue')
+    args = parser.parse_args()
+
+    store = TillStore(args.store)
+    try:
+        if args.command == 'refresh':
+            try:
+                changed = refresh_catalog(store, connect(args))
+            except (OSError, SyncError) as e:
+                sys.exit(f'Catalog not refreshed: {e}')
+            count = store.db.execute('SELECT COUNT(*) FROM product').fetchone()[0]
+            print(f"Catalog {'updated' if changed else 'unchanged'}: {count} products")
+        elif args.command == 'sell':
+            try:
+                client_ref, subtotal, vat, grand_total = store.queue_sale(args.items, args.payment)
+            except KeyError as e:
+                sys.exit(f'Unknown product code {e.args[0]} (run refresh while online)')
+            print(f'Sale {client_ref} queued: subtotal R{format_cents(subtotal)}, '
+                  f'VAT R{format_cents(vat)}, total R{format_cents(grand_total)}')
+        elif args.command == 'sync':
+            server = connect(args)
+            try:
+                totals = sync(store, server, args.batch_size)
+                refresh_catalog(store, server)
+            except OSError as e:
+                sys.exit(f"Server unreachable ({e}); {store.counts().get(QUEUED, 0)} sales still queued")
+            except SyncError as e:
+                sys.exit(f"{e}; {store.counts().get(QUEUED, 0)} sales still queued")
+            print('Synced: ' + (', '.join(f'{count} {status}' for status, count in sorted(totals.items())) or 'nothing queued'))
+            for row in store.db.execute('SELECT client_ref, error FROM queued_sale WHERE status = ?', (REJECTED,)):
+                print(f"  rejected {row['client_ref']}: {row['error']}")
+        else:
+            counts = store.counts()
+            print(f"Catalog snapshot: {store.setting('catalog_updated_at') or 'never'} UTC")
+            print(f"Queued: {counts.get(QUEUED, 0)}, synced: {counts.get(SYNCED, 0)}, rejected: {counts.get(REJECTED, 0)}")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,21 +2,70 @@
 """
 Seed script for Product database
 Creates sample products for testing and demonstration
+
+With --size (or --products/--transactions) it instead generates a
+synthetic store for benchmarking: a catalog of SKUs, an admin and a team
+of cashiers, and a sales history spread over the last --days days. The
+daily sales rollup is rebuilt afterwards, and the sales are logged to the
+sales event log.
+
+Usage:
+    python seed_products.py                          # 5 sample products
+    python seed_products.py --size small             # 1k SKUs, 10k transactions
+    python seed_products.py --size large             # 100k SKUs, 10M transactions
+    python seed_products.py --products 5000 --transactions 0
+
+Synthetic users log in with the password in LOADTEST_PASSWORD:
+    admin@loadtest.example.com, cashier1@loadtest.example.com ... cashierN@loadtest.example.com
 """
 
+import argparse
+import random
 import sys
 import os
+import time
+from datetime import datetime, timedelta
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from app import create_app, db
-from app.models import Product
+from sqlalchemy import column, func, insert, select, table
+from app import create_app, db, bcrypt
+from app.models import Product, Transaction, User
+
+SIZES = {
+    'small': {'products': 1_000, 'transactions': 10_000},
+    'large': {'products': 100_000, 'transactions': 10_000_000},
+}
+
+LOADTEST_PASSWORD = 'loadtest123'
+ADMIN_EMAIL = 'admin@loadtest.example.com'
+CASHIER_EMAIL = 'cashier{}@loadtest.example.com'
+
+WORDS = [
+    'apple', 'banana', 'bread', 'butter', 'cheese', 'chicken', 'chips', 'cola',
+    'coffee', 'cream', 'eggs', 'flour', 'juice', 'maize', 'milk', 'oats',
+    'oil', 'pasta', 'rice', 'salt', 'soap', 'sugar', 'tea', 'tomato',
+    'tuna', 'water', 'yoghurt', 'brown', 'white', 'large', 'small', 'family',
+]
+CATEGORIES = ['Beverages', 'Bakery', 'Cleaning', 'Pantry', 'Dairy', 'Snacks', 'Frozen', 'Toiletries']
+
+CHUNK_SIZE = 10_000
+
+# Raw integer-cents views of the money tables, so bulk loads skip the
+# per-value Decimal conversion of the Money column type
+product_rows = table('product', column('product_code'), column('name'), column('category'),
+                     column('price'), column('stock_quantity'), column('date_created'), column('date_updated'))
+transaction_rows = table('transaction', column('id'), column('cashier_id'), column('subtotal'),
+                         column('vat_amount'), column('grand_total'), column('payment_method'),
+                         column('status'), column('date_created'))
+sale_rows = table('sale', column('transaction_id'), column('product_id'), column('quantity'),
+                  column('unit_price'), column('line_total'), column('date_created'))
+event_rows = table('sales_event', column('kind'), column('product_id'), column('user_id'), column('transaction_id'),
+                   column('quantity'), column('price'), column('category'), column('created_at'))
 
-# Create app context
-app = create_app()
 
-with app.app_context():
+def seed_samples():
     # Clear existing products (optional - comment out if you want to keep existing data)
     # Product.query.delete()
     
@@ -92,3 +141,151 @@ with app.app_context():
             db.session.rollback()
             print(f"❌ Error seeding products: {e}")
             sys.exit(1)
+
+
+def seed_users(cashiers):
+    """Create the load-test admin and cashiers if missing; return the cashier ids"""
+    password_hash = bcrypt.generate_password_hash(LOADTEST_PASSWORD).decode('utf-8')
+    wanted = [(ADMIN_EMAIL, 'Load Test Admin', 'admin')] + [
+        (CASHIER_EMAIL.format(i), f'Load Test Cashier {i}', 'staff') for i in range(1, cashiers + 1)
+    ]
+    existing = {user.email: user for user in User.query.filter(User.email.in_([w[0] for w in wanted]))}
+    for email, name, role in wanted:
+        if email not in existing:
+            existing[email] = User(name=name, email=email, password_hash=password_hash, role=role)
+            db.session.add(existing[email])
+    db.session.commit()
+    return [existing[CASHIER_EMAIL.format(i)].id for i in range(1, cashiers + 1)]
+
+
+def seed_catalog(count, rng):
+    """Insert `count` synthetic SKUs after any already generated"""
+    start = Product.query.filter(Product.product_code.like('SYN-%')).count()
+    now = datetime.utcnow()
+    rows = []
+    for i in range(start, start + count):
+        rows.append({
+            'product_code': f'SYN-{i:06d}',
+            'name': ' '.join(rng.sample(WORDS, 3)).title() + f' {rng.randint(1, 40) * 25}g',
+            'category': rng.choice(CATEGORIES),
+            'price': rng.randint(500, 50_000),  # cents
+            'stock_quantity': 1_000_000,
+            'date_created': now,
+            'date_updated': now,
+        })
+        if len(rows) >= CHUNK_SIZE:
+            db.session.execute(insert(product_rows), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(product_rows), rows)
+    db.session.commit()
+
+
+def seed_transactions(count, cashier_ids, days, rng):
+    """Insert `count` completed sales of 1-6 lines each, spread over the last `days` days,
+    with their sale events"""
+    products = db.session.execute(
+        select(Product.id, Product.price, Product.category).where(Product.product_code.like('SYN-%'))
+    ).all()
+    if not products:
+        print("❌ No synthetic products to sell; seed a catalog first.")
+        sys.exit(1)
+    prices = [(product_id, int(price * 100), category) for product_id, price, category in products]
+
+    next_id = (db.session.query(func.max(Transaction.id)).scalar() or 0) + 1
+    now = datetime.utcnow()
+    span = days * 86400
+    started = time.perf_counter()
+
+    for chunk_start in range(0, count, CHUNK_SIZE):
+        transactions, sales, events = [], [], []
+        for transaction_id in range(next_id + chunk_start, next_id + min(chunk_start + CHUNK_SIZE, count)):
+            created = now - timedelta(seconds=rng.randrange(span))
+            cashier_id = rng.choice(cashier_ids)
+            subtotal = vat = 0
+            for product_id, price, category in rng.sample(prices, min(rng.randint(1, 6), len(prices))):
+                quantity = rng.randint(1, 4)
+                line_total = price * quantity
+                subtotal += line_total
+                vat += (line_total * 15 + 50) // 100  # 15% VAT per line, rounded half up
+                sales.append({
+                    'transaction_id': transaction_id, 'product_id': product_id, 'quantity': quantity,
+                    'unit_price': price, 'line_total': line_total, 'date_created': created,
+                })
+                events.append({
+                    'kind': 'sale', 'product_id': product_id, 'user_id': cashier_id, 'transaction_id': transaction_id,
+                    'quantity': quantity, 'price': price, 'category': category, 'created_at': created,
+                })
+            transactions.append({
+                'id': transaction_id, 'cashier_id': cashier_id,
+                'subtotal': subtotal, 'vat_amount': vat, 'grand_total': subtotal + vat,
+                'payment_method': rng.choice(('cash', 'card')), 'status': 'completed',
+                'date_created': created,
+            })
+        db.session.execute(insert(transaction_rows), transactions)
+        db.session.execute(insert(sale_rows), sales)
+        db.session.execute(insert(event_rows), events)
+        db.session.commit()
+
+        done = min(chunk_start + CHUNK_SIZE, count)
+        if done % 100_000 == 0 or done == count:
+            rate = done / (time.perf_counter() - started)
+            print(f"  {done:,}/{count:,} transactions ({rate:,.0f}/s)")
+
+
+def seed_synthetic(products, transactions, cashiers, days, seed):
+    from app.catalog import catalog
+    from app.events import log_products, COUNT
+    from app.reports import backfill_rollup, backfill_shift_totals
+
+    rng = random.Random(seed)
+    cashier_ids = seed_users(cashiers)
+    print(f"✅ Load-test users ready: {ADMIN_EMAIL} and {cashiers} cashier(s), password '{LOADTEST_PASSWORD}'")
+
+    if products:
+        started = time.perf_counter()
+        seed_catalog(products, rng)
+        print(f"✅ Seeded {products:,} synthetic products in {time.perf_counter() - started:.1f}s")
+
+    if transactions:
+        seed_transactions(transactions, cashier_ids, days, rng)
+        started = time.perf_counter()
+        rows = backfill_rollup()
+        print(f"✅ Rebuilt daily sales rollup ({rows:,} rows) in {time.perf_counter() - started:.1f}s")
+        backfill_shift_totals()
+
+    if products or transactions:
+        # Counted after the sales, as `flask events backfill` does, so
+        # replaying the log reproduces today's stock
+        log_products(COUNT, Product.product_code.like('SYN-%'))
+    catalog.bump()
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=sorted(SIZES), help='synthetic store preset')
+    parser.add_argument('--products', type=int, help='synthetic SKUs to add (overrides --size)')
+    parser.add_argument('--transactions', type=int, help='synthetic transactions to add (overrides --size)')
+    parser.add_argument('--cashiers', type=int, default=20, help='load-test cashier accounts')
+    parser.add_argument('--days', type=int, default=90, help='spread sales over this many past days')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.size is None and args.products is None and args.transactions is None:
+            seed_samples()
+            return
+
+        preset = SIZES.get(args.size, {'products': 0, 'transactions': 0})
+        db.create_all()
+        seed_synthetic(
+            args.products if args.products is not None else preset['products'],
+            args.transactions if args.transactions is not None else preset['transactions'],
+            args.cashiers, args.days, args.seed
+        )
+
+
+if __name__ == '__main__':
+    main()